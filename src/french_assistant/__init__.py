@@ -23,15 +23,41 @@ French Assistant - RAG-система для перевода с русског
 __version__ = "1.0.0"
 __author__ = "Maxim Kalugin"
 
-from .core.assistant import FrenchAssistant
-from .core.config import AssistantConfig, load_config, get_hf_token
-from .safety import SafetyFilter, HallucinationDetector
-from .retrieval import EnhancedRetriever, VectorStoreManager, QueryExpander
-from .enhancements import SelfRAG, CorrectiveRAG, ChainOfVerification
-from .utils import TracingManager, setup_logging
+from typing import TYPE_CHECKING
+
+from .utils.lazy import lazy_exports
+
+if TYPE_CHECKING:
+    from .core.assistant import FrenchAssistant, get_default_assistant
+    from .core.config import AssistantConfig, load_config, get_hf_token
+    from .safety import SafetyFilter, HallucinationDetector
+    from .retrieval import EnhancedRetriever, VectorStoreManager, QueryExpander
+    from .enhancements import SelfRAG, CorrectiveRAG, ChainOfVerification
+    from .utils import TracingManager, setup_logging
+
+# Публичные объекты импортируются лениво (PEP 562), чтобы `import` пакета
+# не тянул за собой тяжёлые зависимости до первого обращения к ним
+_LAZY_IMPORTS = {
+    "FrenchAssistant": ".core.assistant",
+    "get_default_assistant": ".core.assistant",
+    "AssistantConfig": ".core.config",
+    "load_config": ".core.config",
+    "get_hf_token": ".core.config",
+    "SafetyFilter": ".safety",
+    "HallucinationDetector": ".safety",
+    "EnhancedRetriever": ".retrieval",
+    "VectorStoreManager": ".retrieval",
+    "QueryExpander": ".retrieval",
+    "SelfRAG": ".enhancements",
+    "CorrectiveRAG": ".enhancements",
+    "ChainOfVerification": ".enhancements",
+    "TracingManager": ".utils",
+    "setup_logging": ".utils",
+}
 
 __all__ = [
     "FrenchAssistant",
+    "get_default_assistant",
     "AssistantConfig",
     "load_config",
     "get_hf_token",
@@ -46,3 +72,6 @@ __all__ = [
     "TracingManager",
     "setup_logging",
 ]
+
+
+__getattr__, __dir__ = lazy_exports(globals(), _LAZY_IMPORTS)
@@ -7,10 +7,81 @@ CLI интерфейс для French Assistant.
     french-assistant
 """
 
+import queue
+import threading
+import time
+from typing import Iterable, Iterator
+
 import yaml
-from .core.assistant import FrenchAssistant
+from .core.assistant import get_default_assistant
 from .utils.logging import setup_logging
 
+try:
+    from yaml import CSafeDumper as SafeDumper
+except ImportError:
+    from yaml import SafeDumper
+
+# Интервал (в секундах), с которым фрагменты стрима сбрасываются в консоль
+STREAM_FLUSH_INTERVAL = 0.05
+
+# Маркер конца стрима в очереди _batch_chunks
+_STREAM_END = object()
+
+
+def _batch_chunks(
+    chunks: Iterable[str],
+    interval: float = STREAM_FLUSH_INTERVAL
+) -> Iterator[str]:
+    """
+    Объединяет фрагменты стрима в пакеты по времени.
+
+    Вместо print/flush на каждый токен фрагменты копятся в буфере
+    и отдаются одной строкой не позже, чем через interval секунд после
+    первого фрагмента в буфере. Исходный итератор читается в фоновом
+    потоке, поэтому буфер сбрасывается по таймеру, даже если следующий
+    фрагмент задерживается. Исключение из chunks пробрасывается после
+    сброса уже полученного текста.
+    """
+    items = queue.Queue()
+
+    def produce() -> None:
+        try:
+            for chunk in chunks:
+                items.put(chunk)
+        except Exception as e:
+            items.put(e)
+        finally:
+            items.put(_STREAM_END)
+
+    threading.Thread(target=produce, daemon=True).start()
+
+    buffer = []
+    deadline = None
+
+    while True:
+        timeout = None if deadline is None else max(deadline - time.monotonic(), 0.0)
+        try:
+            item = items.get(timeout=timeout)
+        except queue.Empty:
+            yield "".join(buffer)
+            buffer.clear()
+            deadline = None
+            continue
+
+        if item is _STREAM_END:
+            break
+        if isinstance(item, Exception):
+            if buffer:
+                yield "".join(buffer)
+            raise item
+
+        buffer.append(item)
+        if deadline is None:
+            deadline = time.monotonic() + interval
+
+    if buffer:
+        yield "".join(buffer)
+
 
 def main():
     """Точка входа для CLI."""
@@ -18,7 +89,7 @@ def main():
     setup_logging(log_level="INFO")
 
     try:
-        assistant = FrenchAssistant()
+        assistant = get_default_assistant()
         print("Асистент готова к работе!\n")
         print("Команды:")
         print("  - 'exit' - выход")
@@ -38,7 +109,7 @@ def main():
 
             if query.lower() == "stats":
                 stats = assistant.get_statistics()
-                print(f"\n📊 Статистика:\n{yaml.dump(stats, allow_unicode=True)}")
+                print(f"\n📊 Статистика:\n{yaml.dump(stats, Dumper=SafeDumper, allow_unicode=True)}")
                 continue
 
             if query.lower() == "trace":
@@ -48,9 +119,12 @@ def main():
             if not query:
                 continue
 
-            result = assistant.process_query(query)
+            result, chunks = assistant.process_query_stream(query)
 
-            print(f"\n🤖 Ассистент:\n{result['response']}\n")
+            print("\n🤖 Ассистент:")
+            for text in _batch_chunks(chunks):
+                print(text, end="", flush=True)
+            print("\n")
 
             if result["sources"]:
                 print("📚 Источники:")
@@ -3,22 +3,41 @@
 
 Компоненты:
 - FrenchAssistant: Главный класс ассистента
+- get_default_assistant: Общий экземпляр ассистента
 - AssistantConfig: Конфигурация системы
 - load_config: Загрузка конфигурации из файла
 """
 
-from .assistant import FrenchAssistant
-from .config import (
-    AssistantConfig,
-    ModelConfig,
-    VectorDBConfig,
-    RAGConfig,
-    SafetyConfig,
-    load_config,
-)
+from typing import TYPE_CHECKING
+
+from ..utils.lazy import lazy_exports
+
+if TYPE_CHECKING:
+    from .assistant import FrenchAssistant, get_default_assistant
+    from .config import (
+        AssistantConfig,
+        ModelConfig,
+        VectorDBConfig,
+        RAGConfig,
+        SafetyConfig,
+        load_config,
+    )
+
+# Ленивый импорт (PEP 562), см. utils.lazy
+_LAZY_IMPORTS = {
+    "FrenchAssistant": ".assistant",
+    "get_default_assistant": ".assistant",
+    "AssistantConfig": ".config",
+    "ModelConfig": ".config",
+    "VectorDBConfig": ".config",
+    "RAGConfig": ".config",
+    "SafetyConfig": ".config",
+    "load_config": ".config",
+}
 
 __all__ = [
     "FrenchAssistant",
+    "get_default_assistant",
     "AssistantConfig",
     "ModelConfig",
     "VectorDBConfig",
@@ -26,3 +45,6 @@ __all__ = [
     "SafetyConfig",
     "load_config",
 ]
+
+
+__getattr__, __dir__ = lazy_exports(globals(), _LAZY_IMPORTS)
@@ -10,10 +10,13 @@
 
 import re
 import time
+import asyncio
+import warnings
 import logging
-from typing import Any, Dict, List, Optional
-
-from langchain_core.prompts import PromptTemplate
+import functools
+import operator
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Dict, Final, Iterator, List, Optional, Tuple
 
 from .config import AssistantConfig, load_config, get_openai_api_key
 from ..utils.tracing import TracingManager
@@ -22,8 +25,95 @@ from ..safety.hallucination import HallucinationDetector
 from ..retrieval.vectorstore import VectorStoreManager
 from ..retrieval.retriever import EnhancedRetriever
 
+if TYPE_CHECKING:
+    from langchain_core.messages import BaseMessage
+    from langchain_core.prompts import PromptTemplate
+
 logger = logging.getLogger(__name__)
 
+# Пользовательская часть промпта. Системный промпт передаётся отдельным
+# сообщением, чтобы одинаковый префикс кэшировался на стороне провайдера
+USER_PROMPT_TEMPLATE: Final[str] = """## Контекст из базы знаний:
+{context}
+
+## Вопрос пользователя:
+{question}
+
+## Твой ответ:"""
+
+
+# Извлечение текста для перевода из запроса вида "Переведи: ..."
+_TRANSLATION_RE = re.compile(
+    r'перевед(?:ите|и)?\s*:?\s*["\']?(.+?)["\']?\s*$',
+    re.IGNORECASE
+)
+
+# Определение намерения пользователя за один проход по запросу
+_INTENT_RE = re.compile(
+    r"(?P<translation>перевед|перевод)"
+    r"|(?P<how_to_say>как сказать)"
+    r"|(?P<grammar>грамматик|правил)"
+    r"|(?P<idiom>идиом|выражен)",
+    re.IGNORECASE
+)
+
+# Извлечение полей документа одним вызовом при сборке источников
+_DOC_FIELDS = operator.attrgetter("page_content", "metadata")
+
+# Максимальная длина контекста, которую используют шаблонные ответы
+_TEMPLATE_CONTEXT_LIMIT = 700
+
+# Приоритет намерений (если в запросе найдено несколько) и их обработчики
+_INTENT_FORMATTERS = {
+    "translation": "_format_translation_response",
+    "how_to_say": "_format_how_to_say_response",
+    "grammar": "_format_grammar_response",
+    "idiom": "_format_idiom_response",
+}
+
+# Шаблоны ответов демо-режима (без LLM)
+_TRANSLATION_RESPONSE: Final[str] = """📝 **Запрос на перевод:** "{text}"
+
+            💡 **Комментарий:** Для точного перевода использована информация из базы знаний.
+
+            📚 **Релевантный контекст из базы:**
+            {context}...
+
+            ⚠️ **Примечание:** Для качественного перевода укажите контекст использования."""
+
+_HOW_TO_SAY_RESPONSE: Final[str] = """📝 **Ваш вопрос:** {query}
+
+            📚 **Информация из базы знаний:**
+            {context}
+
+            💡 **Совет:** Обратите внимание на контекст и регистр речи."""
+
+_GRAMMAR_RESPONSE: Final[str] = """📖 **Грамматический вопрос:** {query}
+
+        📚 **Информация из базы знаний:**
+        {context}
+
+        💡 **Комментарий:** Обратите внимание на примеры использования."""
+
+_IDIOM_RESPONSE: Final[str] = """🗣️ **Вопрос об идиомах:** {query}
+
+        📚 **Информация из базы знаний:**
+        {context}
+
+        💡 **Совет:** Идиомы часто не переводятся буквально."""
+
+_GENERAL_RESPONSE: Final[str] = """📝 **Ваш вопрос:** {query}
+
+        📚 **Релевантная информация из базы знаний:**
+        {context}
+
+        💡 **Примечание:** Уточните вопрос для более детального ответа."""
+
+
+def _short(text: str, limit: int) -> str:
+    """Обрезает текст до limit символов и добавляет многоточие."""
+    return f"{text[:limit]}..."
+
 
 class FrenchAssistant:
     """
@@ -62,7 +152,7 @@ class FrenchAssistant:
             self.config = load_config(config_path)
 
         # Инициализация компонентов
-        self.tracer = TracingManager()
+        self.tracer = TracingManager(enabled=self.config.tracing.enabled)
         self.safety_filter = SafetyFilter(self.config.safety)
         self.hallucination_detector = HallucinationDetector(
             min_grounding_score=self.config.safety.min_grounding_score
@@ -78,13 +168,12 @@ class FrenchAssistant:
             config=self.config.rag.retrieval,
             tracer=self.tracer
         )
+        # Новые документы делают закэшированные результаты поиска устаревшими
+        self.vectorstore_manager.on_documents_added(self.retriever.clear_cache)
 
         # Инициализация LLM
         self.llm = self._init_llm()
 
-        # Промпт
-        self.prompt_template = self._create_prompt_template()
-
         logger.info("FrenchAssistant initialized successfully!")
 
     def _init_llm(self):
@@ -92,7 +181,8 @@ class FrenchAssistant:
         Инициализирует LLM модель.
 
         Поддерживает OpenAI (по умолчанию).
-        Возвращает None если API ключ не настроен.
+        Возвращает None если API ключ не настроен — в этом случае
+        langchain_openai не импортируется вовсе.
         """
         if self.config.model.provider == "openai":
             api_key = get_openai_api_key()
@@ -111,6 +201,8 @@ class FrenchAssistant:
                     temperature=self.config.model.temperature,
                     max_tokens=self.config.model.max_new_tokens,
                     api_key=api_key,
+                    # Повышает вероятность попадания в кэш общего префикса промпта
+                    extra_body={"prompt_cache_key": self.config.model.prompt_cache_key},
                 )
                 logger.info(f"OpenAI LLM инициализирован: {self.config.model.model_name}")
                 return llm
@@ -128,24 +220,44 @@ class FrenchAssistant:
         logger.warning(f"Неизвестный провайдер: {self.config.model.provider}")
         return None
 
-    def _create_prompt_template(self) -> PromptTemplate:
-        """Создаёт шаблон промпта."""
-        template = """
-            {system_prompt}
-
-            ## Контекст из базы знаний:
-            {context}
-
-            ## Вопрос пользователя:
-            {question}
+    @property
+    def prompt_template(self) -> "PromptTemplate":
+        """
+        Шаблон промпта в виде PromptTemplate (устарело).
 
-            ## Твой ответ:
+        Генерация использует _build_prompt (отдельные системное и
+        пользовательское сообщения); атрибут оставлен для совместимости
+        и будет удалён.
         """
+        warnings.warn(
+            "FrenchAssistant.prompt_template устарел и будет удалён; "
+            "промпт собирается из системного и пользовательского сообщений",
+            DeprecationWarning,
+            stacklevel=2
+        )
+        from langchain_core.prompts import PromptTemplate
+
         return PromptTemplate(
             input_variables=["system_prompt", "context", "question"],
-            template=template
+            template="{system_prompt}\n\n" + USER_PROMPT_TEMPLATE
         )
 
+    def _build_prompt(self, query: str, context: str) -> List["BaseMessage"]:
+        """
+        Формирует сообщения для LLM из запроса и контекста.
+
+        Системный промпт идёт первым отдельным сообщением: этот префикс
+        одинаков во всех запросах и кэшируется провайдером (prompt caching).
+        """
+        from langchain_core.messages import HumanMessage, SystemMessage
+
+        return [
+            SystemMessage(content=self.config.system_prompt),
+            HumanMessage(
+                content=USER_PROMPT_TEMPLATE.format(context=context, question=query)
+            ),
+        ]
+
     def _generate_response(self, query: str, context: str) -> str:
         """
         Генерирует ответ на основе контекста.
@@ -160,86 +272,231 @@ class FrenchAssistant:
         if self.llm is None:
             return self._generate_template_response(query, context)
 
-        prompt = self.prompt_template.format(
-            system_prompt=self.config.system_prompt,
-            context=context,
-            question=query
-        )
-
-        response = self.llm.invoke(prompt)
+        response = self.llm.invoke(self._build_prompt(query, context))
         return response.content
 
+    def _stream_response(self, query: str, context: str) -> Iterator[str]:
+        """
+        Генерирует ответ потоково, отдавая фрагменты по мере декодирования.
+
+        В демо-режиме (без LLM) шаблонный ответ отдаётся одним фрагментом.
+
+        Args:
+            query: Запрос пользователя
+            context: Контекст из retrieved документов
+
+        Yields:
+            Фрагменты сгенерированного ответа
+        """
+        if self.llm is None:
+            yield self._generate_template_response(query, context)
+            return
+
+        for chunk in self.llm.stream(self._build_prompt(query, context)):
+            if chunk.content:
+                yield chunk.content
+
     def _generate_template_response(self, query: str, context: str) -> str:
         """Генерирует шаблонный ответ (для демонстрации без LLM)."""
-        query_lower = query.lower()
-
-        if "перевед" in query_lower or "перевод" in query_lower:
-            return self._format_translation_response(query, context)
-        elif "как сказать" in query_lower:
-            return self._format_how_to_say_response(query, context)
-        elif "грамматик" in query_lower or "правил" in query_lower:
-            return self._format_grammar_response(query, context)
-        elif "идиом" in query_lower or "выражен" in query_lower:
-            return self._format_idiom_response(query, context)
-        else:
-            return self._format_general_response(query, context)
+        # Шаблоны показывают лишь начало контекста — обрезаем его один раз
+        context = context[:_TEMPLATE_CONTEXT_LIMIT]
+        intents = {match.lastgroup for match in _INTENT_RE.finditer(query)}
+
+        for intent, formatter_name in _INTENT_FORMATTERS.items():
+            if intent in intents:
+                return getattr(self, formatter_name)(query, context)
+
+        return self._format_general_response(query, context)
 
     def _format_translation_response(self, query: str, context: str) -> str:
         """Форматирует ответ на запрос перевода."""
-        text_match = re.search(
-            r'перевед[и|ите]?\s*:?\s*["\']?(.+?)["\']?\s*$',
-            query,
-            re.IGNORECASE
-        )
+        text_match = _TRANSLATION_RE.search(query)
         if text_match:
             text_to_translate = text_match.group(1)
         else:
             text_to_translate = query.replace("переведи", "").replace("перевод", "").strip()
 
-        return f"""📝 **Запрос на перевод:** "{text_to_translate}"
+        return _TRANSLATION_RESPONSE.format(text=text_to_translate, context=context[:500])
 
-            💡 **Комментарий:** Для точного перевода использована информация из базы знаний.
+    def _format_how_to_say_response(self, query: str, context: str) -> str:
+        """Форматирует ответ на вопрос 'как сказать'."""
+        return _HOW_TO_SAY_RESPONSE.format(query=query, context=context[:600])
 
-            📚 **Релевантный контекст из базы:**
-            {context[:500]}...
+    def _format_grammar_response(self, query: str, context: str) -> str:
+        """Форматирует ответ на грамматический вопрос."""
+        return _GRAMMAR_RESPONSE.format(query=query, context=context[:700])
 
-            ⚠️ **Примечание:** Для качественного перевода укажите контекст использования."""
+    def _format_idiom_response(self, query: str, context: str) -> str:
+        """Форматирует ответ об идиомах."""
+        return _IDIOM_RESPONSE.format(query=query, context=context[:700])
 
-    def _format_how_to_say_response(self, query: str, context: str) -> str:
-        """Форматирует ответ на вопрос 'как сказать'."""
-        return f"""📝 **Ваш вопрос:** {query}
+    def _format_general_response(self, query: str, context: str) -> str:
+        """Форматирует общий ответ."""
+        return _GENERAL_RESPONSE.format(query=query, context=context[:700])
 
-            📚 **Информация из базы знаний:**
-            {context[:600]}
+    def _new_result(self, query: str) -> Dict[str, Any]:
+        """Создаёт пустой словарь результата обработки запроса."""
+        return {
+            "query": query,
+            "response": "",
+            "sources": [],
+            "metadata": {},
+            "trace": None,
+            "is_safe": True,
+            "error": None
+        }
 
-            💡 **Совет:** Обратите внимание на контекст и регистр речи."""
+    def _prepare_context(self, query: str, result: Dict[str, Any]) -> Optional[str]:
+        """
+        Выполняет safety check и retrieval.
 
-    def _format_grammar_response(self, query: str, context: str) -> str:
-        """Форматирует ответ на грамматический вопрос."""
-        return f"""📖 **Грамматический вопрос:** {query}
+        Args:
+            query: Запрос пользователя
+            result: Словарь результата, заполняется по ходу обработки
 
-        📚 **Информация из базы знаний:**
-        {context[:700]}
+        Returns:
+            Контекст для генерации или None, если обработка прервана
+            (в этом случае ответ и ошибка уже записаны в result)
+        """
+        self.tracer.log_event("query_received", "FrenchAssistant", query, "processing")
 
-        💡 **Комментарий:** Обратите внимание на примеры использования."""
+        # 1. Safety check
+        safety_check = self.safety_filter.filter_input(query)
+        if not self._apply_safety_check(query, safety_check, result):
+            return None
 
-    def _format_idiom_response(self, query: str, context: str) -> str:
-        """Форматирует ответ об идиомах."""
-        return f"""🗣️ **Вопрос об идиомах:** {query}
+        # 2. Retrieval
+        try:
+            docs = self.retriever.retrieve(query)
+        except Exception as e:
+            self._set_retrieval_error(result, e)
+            return None
 
-        📚 **Информация из базы знаний:**
-        {context[:700]}
+        return self._build_context(query, docs, result)
 
-        💡 **Совет:** Идиомы часто не переводятся буквально."""
+    def _apply_safety_check(
+        self,
+        query: str,
+        safety_check: Tuple[bool, str, Dict],
+        result: Dict[str, Any]
+    ) -> bool:
+        """Записывает результат safety check; возвращает True, если запрос безопасен."""
+        is_safe, error_msg, safety_meta = safety_check
+        result["metadata"]["safety"] = safety_meta
 
-    def _format_general_response(self, query: str, context: str) -> str:
-        """Форматирует общий ответ."""
-        return f"""📝 **Ваш вопрос:** {query}
+        if not is_safe:
+            result["is_safe"] = False
+            result["response"] = error_msg
+            result["error"] = error_msg
+            self.tracer.log_event("safety_blocked", "SafetyFilter", query, error_msg)
+            return False
 
-        📚 **Релевантная информация из базы знаний:**
-        {context[:700]}
+        self.tracer.log_event("safety_passed", "SafetyFilter", query, "safe")
+        return True
+
+    def _set_retrieval_error(self, result: Dict[str, Any], error: Exception) -> None:
+        """Записывает в результат ошибку поиска."""
+        logger.error(f"Retrieval error: {error}")
+        result["error"] = f"Ошибка поиска: {str(error)}"
+        result["response"] = "Извините, произошла ошибка при поиске информации."
+
+    def _build_context(self, query: str, docs: List, result: Dict[str, Any]) -> str:
+        """Заполняет источники в результате и собирает контекст из документов."""
+        # Источники и контекст собираются за один проход по документам
+        sources = []
+        parts = []
+        for page, metadata in map(_DOC_FIELDS, docs):
+            sources.append({
+                "content": _short(page, 200),
+                "metadata": metadata
+            })
+            parts.append(page)
+
+        result["sources"] = sources
 
-        💡 **Примечание:** Уточните вопрос для более детального ответа."""
+        self.tracer.log_event(
+            "retrieval_complete",
+            "EnhancedRetriever",
+            query,
+            f"{len(docs)} documents retrieved"
+        )
+
+        return "\n\n---\n\n".join(parts)
+
+    def _check_hallucinations(
+        self,
+        response: str,
+        context: str,
+        result: Dict[str, Any]
+    ) -> str:
+        """
+        Проверяет ответ на галлюцинации и записывает метаданные grounding.
+
+        Returns:
+            Предупреждение, которое нужно добавить к ответу (или пустая строка)
+        """
+        if self.llm is None:
+            # Шаблонный ответ состоит из фрагментов контекста — проверять нечего
+            result["metadata"]["grounding"] = {
+                "is_grounded": True,
+                "score": 1.0,
+                "confidence": 1.0
+            }
+            return ""
+
+        hallucination_result = self.hallucination_detector.detect(response, context)
+        result["metadata"]["grounding"] = {
+            "is_grounded": not hallucination_result["has_hallucinations"],
+            "score": hallucination_result["grounding_score"],
+            "confidence": hallucination_result["confidence"]
+        }
+
+        if hallucination_result["has_hallucinations"]:
+            logger.warning("Potential hallucination detected")
+            return "\n\n⚠️ *Некоторые части ответа могут требовать проверки.*"
+        return ""
+
+    def _set_generation_error(self, result: Dict[str, Any], error: Exception) -> None:
+        """Записывает в результат ошибку генерации."""
+        logger.error(f"Generation error: {error}")
+        result["error"] = f"Ошибка генерации: {str(error)}"
+        result["response"] = "Извините, произошла ошибка при генерации ответа."
+
+    def _complete_result(
+        self,
+        query: str,
+        response: str,
+        context: str,
+        result: Dict[str, Any],
+        start_ns: int
+    ) -> None:
+        """Записывает ответ, проверяет его на галлюцинации и финализирует результат."""
+        result["response"] = response
+
+        if self.tracer.enabled:
+            self.tracer.log_event(
+                "response_generated",
+                "LLM",
+                _short(query, 50),
+                _short(response, 100)
+            )
+
+        result["response"] += self._check_hallucinations(response, context, result)
+        self._finalize(query, result, start_ns)
+
+    def _finalize(self, query: str, result: Dict[str, Any], start_ns: int) -> None:
+        """Записывает итоговую длительность и трассировку в результат."""
+        duration = (time.perf_counter_ns() - start_ns) // 1_000_000
+        result["metadata"]["total_duration_ms"] = duration
+        result["trace"] = self.tracer.get_trace_report()
+
+        if self.tracer.enabled:
+            self.tracer.log_event(
+                "query_complete",
+                "FrenchAssistant",
+                _short(query, 50),
+                f"Response generated in {duration}ms"
+            )
 
     def process_query(self, query: str) -> Dict[str, Any]:
         """
@@ -263,102 +520,185 @@ class FrenchAssistant:
             - is_safe: прошёл ли safety check
             - error: сообщение об ошибке (если есть)
         """
-        start_time = time.time()
+        start_ns = time.perf_counter_ns()
+        result = self._new_result(query)
 
-        result = {
-            "query": query,
-            "response": "",
-            "sources": [],
-            "metadata": {},
-            "trace": None,
-            "is_safe": True,
-            "error": None
-        }
+        # 1-2. Safety check и retrieval
+        context = self._prepare_context(query, result)
+        if context is None:
+            return result
 
-        self.tracer.log_event("query_received", "FrenchAssistant", query, "processing")
+        # 3. Response generation
+        try:
+            response = self._generate_response(query, context)
+        except Exception as e:
+            self._set_generation_error(result, e)
+            return result
 
-        # 1. Safety check
-        is_safe, error_msg, safety_meta = self.safety_filter.filter_input(query)
-        result["metadata"]["safety"] = safety_meta
+        # 4. Hallucination check и финализация
+        self._complete_result(query, response, context, result, start_ns)
 
-        if not is_safe:
-            result["is_safe"] = False
-            result["response"] = error_msg
-            result["error"] = error_msg
-            self.tracer.log_event("safety_blocked", "SafetyFilter", query, error_msg)
-            return result
+        return result
 
-        self.tracer.log_event("safety_passed", "SafetyFilter", query, "safe")
+    def process_query_stream(
+        self,
+        query: str
+    ) -> Tuple[Dict[str, Any], Iterator[str]]:
+        """
+        Обрабатывает запрос с потоковой генерацией ответа.
 
-        # 2. Retrieval
-        try:
-            docs = self.retriever.retrieve(query)
-            result["sources"] = [
-                {
-                    "content": doc.page_content[:200] + "...",
-                    "metadata": doc.metadata
-                }
-                for doc in docs
-            ]
-            context = "\n\n---\n\n".join([doc.page_content for doc in docs])
+        Safety check и retrieval выполняются сразу, генерация — лениво,
+        по мере чтения итератора. После его исчерпания result содержит
+        полный ответ и те же метаданные, что и в process_query.
 
-            self.tracer.log_event(
-                "retrieval_complete",
-                "EnhancedRetriever",
-                query,
-                f"{len(docs)} documents retrieved"
-            )
+        Args:
+            query: Запрос пользователя
 
-        except Exception as e:
-            logger.error(f"Retrieval error: {e}")
-            result["error"] = f"Ошибка поиска: {str(e)}"
-            result["response"] = "Извините, произошла ошибка при поиске информации."
-            return result
+        Returns:
+            (result, chunks) — словарь результата (sources доступны сразу)
+            и итератор фрагментов ответа
 
-        # 3. Response generation
+        Пример:
+            result, chunks = assistant.process_query_stream("Переведи: Привет")
+            for text in chunks:
+                print(text, end="", flush=True)
+        """
+        start_ns = time.perf_counter_ns()
+        result = self._new_result(query)
+
+        context = self._prepare_context(query, result)
+        if context is None:
+            return result, iter([result["response"]])
+
+        return result, self._stream_and_finalize(query, context, result, start_ns)
+
+    def _stream_and_finalize(
+        self,
+        query: str,
+        context: str,
+        result: Dict[str, Any],
+        start_ns: int
+    ) -> Iterator[str]:
+        """Стримит ответ и по завершении выполняет проверку и финализацию."""
+        parts: List[str] = []
         try:
-            response = self._generate_response(query, context)
-            result["response"] = response
+            for text in self._stream_response(query, context):
+                parts.append(text)
+                yield text
+
+        except Exception as e:
+            self._set_generation_error(result, e)
+            yield "\n" + result["response"]
+            return
 
+        response = "".join(parts)
+        if self.tracer.enabled:
             self.tracer.log_event(
                 "response_generated",
                 "LLM",
-                query[:50] + "...",
-                response[:100] + "..."
+                _short(query, 50),
+                _short(response, 100)
             )
 
-        except Exception as e:
-            logger.error(f"Generation error: {e}")
-            result["error"] = f"Ошибка генерации: {str(e)}"
-            result["response"] = "Извините, произошла ошибка при генерации ответа."
-            return result
+        warning = self._check_hallucinations(response, context, result)
+        if warning:
+            yield warning
+        result["response"] = response + warning
 
-        # 4. Hallucination check
-        hallucination_result = self.hallucination_detector.detect(response, context)
-        result["metadata"]["grounding"] = {
-            "is_grounded": not hallucination_result["has_hallucinations"],
-            "score": hallucination_result["grounding_score"],
-            "confidence": hallucination_result["confidence"]
-        }
+        self._finalize(query, result, start_ns)
 
-        if hallucination_result["has_hallucinations"]:
-            logger.warning("Potential hallucination detected")
-            result["response"] += "\n\n⚠️ *Некоторые части ответа могут требовать проверки.*"
+    async def aprocess_query(self, query: str) -> Dict[str, Any]:
+        """
+        Асинхронная версия process_query.
 
-        # Финализация
-        duration = (time.time() - start_time) * 1000
-        result["metadata"]["total_duration_ms"] = duration
-        result["trace"] = self.tracer.get_trace_report()
+        Safety check и retrieval выполняются в отдельном потоке (retrieval —
+        только для прошедших проверку запросов, как в process_query),
+        генерация использует llm.ainvoke, а проверка на галлюцинации не
+        блокирует event loop. Результат совпадает по формату с process_query.
 
-        self.tracer.log_event(
-            "query_complete",
-            "FrenchAssistant",
-            query[:50] + "...",
-            f"Response generated in {duration:.2f}ms"
+        Args:
+            query: Запрос пользователя
+
+        Returns:
+            Dict с ответом и метаданными (см. process_query)
+        """
+        start_ns = time.perf_counter_ns()
+        result = self._new_result(query)
+
+        # 1-2. Safety check и retrieval
+        context = await asyncio.to_thread(self._prepare_context, query, result)
+        if context is None:
+            return result
+
+        # 3. Response generation
+        try:
+            if self.llm is None:
+                response = self._generate_template_response(query, context)
+            else:
+                message = await self.llm.ainvoke(self._build_prompt(query, context))
+                response = message.content
+        except Exception as e:
+            self._set_generation_error(result, e)
+            return result
+
+        # 4. Hallucination check и финализация
+        await asyncio.to_thread(
+            self._complete_result, query, response, context, result, start_ns
         )
 
         return result
 
+    def process_queries(
+        self,
+        queries: List[str],
+        max_workers: int = 8
+    ) -> List[Dict[str, Any]]:
+        """
+        Обрабатывает пакет запросов (для оценки качества и регрессии).
+
+        Safety check и retrieval выполняются параллельно в пуле потоков,
+        а генерация — одним вызовом llm.batch вместо N последовательных
+        запросов к API.
+
+        Args:
+            queries: Список запросов пользователя
+            max_workers: Максимальное число потоков для retrieval
+
+        Returns:
+            Список результатов в том же порядке и формате, что и process_query
+        """
+        start_ns = time.perf_counter_ns()
+        results = [self._new_result(query) for query in queries]
+
+        # 1-2. Safety check и retrieval
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            contexts = list(executor.map(self._prepare_context, queries, results))
+
+        pending = [i for i, context in enumerate(contexts) if context is not None]
+        if not pending:
+            return results
+
+        # 3. Response generation
+        if self.llm is None:
+            responses = [
+                self._generate_template_response(queries[i], contexts[i])
+                for i in pending
+            ]
+        else:
+            prompts = [self._build_prompt(queries[i], contexts[i]) for i in pending]
+            responses = self.llm.batch(prompts, return_exceptions=True)
+
+        # 4. Hallucination check и финализация
+        for i, response in zip(pending, responses):
+            if isinstance(response, Exception):
+                self._set_generation_error(results[i], response)
+                continue
+
+            text = response if isinstance(response, str) else response.content
+            self._complete_result(queries[i], text, contexts[i], results[i], start_ns)
+
+        return results
+
     def get_statistics(self) -> Dict[str, Any]:
         """Возвращает статистику работы ассистента."""
         return {
@@ -370,3 +710,15 @@ class FrenchAssistant:
                 "retrieval_k": self.config.rag.retrieval.k
             }
         }
+
+
+@functools.lru_cache(maxsize=1)
+def get_default_assistant() -> FrenchAssistant:
+    """
+    Возвращает общий экземпляр FrenchAssistant с конфигурацией по умолчанию.
+
+    Экземпляр создаётся при первом вызове и переиспользуется, поэтому
+    векторное хранилище, эмбеддинги и LLM инициализируются один раз
+    на процесс.
+    """
+    return FrenchAssistant()
@@ -7,17 +7,27 @@
 - get_hf_token: функция получения HuggingFace токена
 """
 
+import copy
 import os
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, fields
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple, Type, TypeVar
 
 import yaml
 from dotenv import load_dotenv
 
+# libyaml-загрузчик заметно быстрее чистого Python; fallback, если PyYAML
+# собран без libyaml
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
 # Загружаем переменные окружения из .env файла
 load_dotenv()
 
+T = TypeVar("T")
+
 
 def get_hf_token() -> Optional[str]:
     """
@@ -45,6 +55,7 @@ class ModelConfig:
     """Конфигурация LLM модели."""
     provider: str = "openai"  # "openai" или "huggingface"
     model_name: str = "gpt-4o-mini"  # Модель OpenAI
+    prompt_cache_key: str = "french_assistant_v1"  # Ключ кэша промпта OpenAI
     primary_model: str = "IlyaGusev/saiga_llama3_8b"  # Для HuggingFace (legacy)
     alternative_models: List[str] = field(default_factory=list)
     temperature: float = 0.3
@@ -59,6 +70,10 @@ class EmbeddingsConfig:
     """Конфигурация эмбеддингов."""
     model: str = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
     device: str = "cpu"
+    lazy_weights: bool = False  # инициализация на meta-устройстве + mmap весов (нужен accelerate)
+    quantize: bool = False  # динамическая INT8-квантизация (только CPU)
+    backend: str = "torch"  # "torch" или "onnx" (ONNX Runtime)
+    normalize: bool = True  # L2-нормализация векторов при кодировании
 
 
 @dataclass
@@ -67,6 +82,7 @@ class VectorDBConfig:
     type: str = "chromadb"
     persist_directory: str = "./data/chroma_db"
     collection_name: str = "french_knowledge"
+    batch_size: int = 200  # Документов на одну вставку в ChromaDB
     embeddings: EmbeddingsConfig = field(default_factory=EmbeddingsConfig)
 
 
@@ -88,6 +104,11 @@ class RetrievalConfig:
     fetch_k: int = 20
     lambda_mult: float = 0.7
     top_k_final: int = 3
+    parallel_queries: bool = True  # Только для потокобезопасных хранилищ
+    exact_cache_size: int = 2048  # 0 - кэш отключён
+    semantic_cache_size: int = 256  # 0 - кэш отключён
+    semantic_cache_threshold: float = 0.95
+    hyde_cache_dir: Optional[str] = None  # Дисковый кэш HyDE-документов; None - только в памяти
 
 
 @dataclass
@@ -129,75 +150,45 @@ class AssistantConfig:
 
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> "AssistantConfig":
-        """Создаёт конфигурацию из словаря."""
+        """
+        Создаёт конфигурацию из словаря.
+
+        Отсутствующие в словаре поля получают значения по умолчанию,
+        неизвестные ключи игнорируются.
+        """
         config = cls()
 
-        # Model config
+        # Model config (параметры генерации лежат во вложенной секции)
         if "MODEL_CONFIG" in data:
             mc = data["MODEL_CONFIG"]
-            gen = mc.get("generation", {})
-            config.model = ModelConfig(
-                provider=mc.get("provider", config.model.provider),
-                model_name=mc.get("model_name", config.model.model_name),
-                primary_model=mc.get("primary_model", config.model.primary_model),
-                alternative_models=mc.get("alternative_models", []),
-                temperature=gen.get("temperature", config.model.temperature),
-                max_new_tokens=gen.get("max_new_tokens", config.model.max_new_tokens),
-                top_p=gen.get("top_p", config.model.top_p),
-                repetition_penalty=gen.get("repetition_penalty", config.model.repetition_penalty),
-                do_sample=gen.get("do_sample", config.model.do_sample),
-            )
+            config.model = _from_section(ModelConfig, {**mc, **mc.get("generation", {})})
 
         # Vector DB config
         if "VECTOR_DB" in data:
             vdb = data["VECTOR_DB"]
-            emb = vdb.get("embeddings", {})
-            config.vector_db = VectorDBConfig(
-                type=vdb.get("type", config.vector_db.type),
-                persist_directory=vdb.get("persist_directory", config.vector_db.persist_directory),
-                collection_name=vdb.get("collection_name", config.vector_db.collection_name),
-                embeddings=EmbeddingsConfig(
-                    model=emb.get("model", config.vector_db.embeddings.model),
-                    device=emb.get("device", config.vector_db.embeddings.device),
-                ),
+            config.vector_db = _from_section(
+                VectorDBConfig,
+                vdb,
+                embeddings=_from_section(EmbeddingsConfig, vdb.get("embeddings", {})),
             )
 
         # RAG config
         if "RAG_CONFIG" in data:
             rag = data["RAG_CONFIG"]
-            chunk = rag.get("chunking", {})
-            retr = rag.get("retrieval", {})
             config.rag = RAGConfig(
-                chunking=ChunkingConfig(
-                    chunk_size=chunk.get("chunk_size", config.rag.chunking.chunk_size),
-                    chunk_overlap=chunk.get("chunk_overlap", config.rag.chunking.chunk_overlap),
-                    separators=chunk.get("separators", config.rag.chunking.separators),
-                ),
-                retrieval=RetrievalConfig(
-                    search_type=retr.get("search_type", config.rag.retrieval.search_type),
-                    k=retr.get("k", config.rag.retrieval.k),
-                    fetch_k=retr.get("fetch_k", config.rag.retrieval.fetch_k),
-                    lambda_mult=retr.get("lambda_mult", config.rag.retrieval.lambda_mult),
-                    top_k_final=retr.get("top_k_final", config.rag.retrieval.top_k_final),
-                ),
+                chunking=_from_section(ChunkingConfig, rag.get("chunking", {})),
+                retrieval=_from_section(RetrievalConfig, rag.get("retrieval", {})),
             )
 
         # Safety config
         if "SAFETY" in data:
-            sf = data["SAFETY"].get("input_filter", {})
-            config.safety = SafetyConfig(
-                max_length=sf.get("max_length", config.safety.max_length),
-                enabled=sf.get("enabled", config.safety.enabled),
+            config.safety = _from_section(
+                SafetyConfig, data["SAFETY"].get("input_filter", {})
             )
 
         # Tracing config
         if "TRACING" in data:
-            tr = data["TRACING"]
-            config.tracing = TracingConfig(
-                enabled=tr.get("enabled", config.tracing.enabled),
-                log_level=tr.get("log_level", config.tracing.log_level),
-                log_file=tr.get("log_file", config.tracing.log_file),
-            )
+            config.tracing = _from_section(TracingConfig, data["TRACING"])
 
         # System prompt
         config.system_prompt = data.get("SYSTEM_PROMPT", "")
@@ -205,6 +196,23 @@ class AssistantConfig:
         return config
 
 
+def _from_section(cls: Type[T], section: Dict[str, Any], **overrides: Any) -> T:
+    """
+    Создаёт датакласс конфигурации из секции YAML.
+
+    Берёт из секции только ключи, совпадающие с полями датакласса;
+    overrides задают уже собранные вложенные конфигурации.
+    """
+    names = {f.name for f in fields(cls)}
+    kwargs = {key: value for key, value in section.items() if key in names}
+    kwargs.update(overrides)
+    return cls(**kwargs)
+
+
+# Кэш загруженных конфигураций: путь -> (mtime_ns, конфигурация)
+_CONFIG_CACHE: Dict[str, Tuple[int, "AssistantConfig"]] = {}
+
+
 def get_default_config_path() -> Path:
     """Возвращает путь к default_config.yaml внутри пакета."""
     return Path(__file__).parent.parent / "default_config.yaml"
@@ -220,6 +228,9 @@ def load_config(config_path: Optional[str] = None) -> AssistantConfig:
 
     Returns:
         AssistantConfig с загруженными настройками
+
+    Результат разбора кэшируется по пути и времени изменения файла,
+    поэтому повторные вызовы не перечитывают YAML.
     """
     if config_path is None:
         # Используем default_config.yaml из пакета
@@ -231,7 +242,16 @@ def load_config(config_path: Optional[str] = None) -> AssistantConfig:
         # Возвращаем конфигурацию по умолчанию
         return AssistantConfig()
 
-    with open(config_path, "r", encoding="utf-8") as f:
-        data = yaml.safe_load(f)
+    # Повторная загрузка того же файла берётся из кэша, пока файл не изменён
+    resolved_path = str(Path(config_path).resolve())
+    mtime_ns = os.stat(resolved_path).st_mtime_ns
+
+    cached = _CONFIG_CACHE.get(resolved_path)
+    if cached is None or cached[0] != mtime_ns:
+        with open(resolved_path, "r", encoding="utf-8") as f:
+            data = yaml.load(f, Loader=SafeLoader)
+        cached = (mtime_ns, AssistantConfig.from_dict(data))
+        _CONFIG_CACHE[resolved_path] = cached
 
-    return AssistantConfig.from_dict(data)
+    # Копия, чтобы изменения конфигурации одного ассистента не влияли на другие
+    return copy.deepcopy(cached[1])
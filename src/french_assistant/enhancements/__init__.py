@@ -5,18 +5,40 @@
 - SelfRAG: Самооценка качества retrieval
 - CorrectiveRAG: Коррекция результатов retrieval
 - ChainOfVerification: Пошаговая верификация ответов
-- RetrievalQuality: Enum для оценки качества
+- RetrievalQuality: IntFlag для оценки качества
+- PreparedDoc: Документ с предвычисленными токенами
 - VerificationResult: Результат верификации
 """
 
-from .self_rag import SelfRAG, RetrievalQuality
-from .crag import CorrectiveRAG
-from .cove import ChainOfVerification, VerificationResult
+from typing import TYPE_CHECKING
+
+from ..utils.lazy import lazy_exports
+
+if TYPE_CHECKING:
+    from .self_rag import SelfRAG, RetrievalQuality, PreparedDoc, prepare_documents
+    from .crag import CorrectiveRAG
+    from .cove import ChainOfVerification, VerificationResult
+
+# Ленивый импорт (PEP 562), см. utils.lazy
+_LAZY_IMPORTS = {
+    "SelfRAG": ".self_rag",
+    "RetrievalQuality": ".self_rag",
+    "PreparedDoc": ".self_rag",
+    "prepare_documents": ".self_rag",
+    "CorrectiveRAG": ".crag",
+    "ChainOfVerification": ".cove",
+    "VerificationResult": ".cove",
+}
 
 __all__ = [
     "SelfRAG",
     "RetrievalQuality",
+    "PreparedDoc",
+    "prepare_documents",
     "CorrectiveRAG",
     "ChainOfVerification",
     "VerificationResult",
 ]
+
+
+__getattr__, __dir__ = lazy_exports(globals(), _LAZY_IMPORTS)
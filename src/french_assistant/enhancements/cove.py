@@ -11,10 +11,55 @@
 import re
 import logging
 from dataclasses import dataclass
-from typing import List, Tuple
+from typing import FrozenSet, Iterable, List, Optional, Sequence, Tuple, Union
+
+from .self_rag import PreparedDoc
 
 logger = logging.getLogger(__name__)
 
+# Шаблоны извлечения утверждений из ответа
+_TRANSLATION_RE = re.compile(
+    r"(?:перевод|французски|traduire)[:\s]+([^.!?\n]+)", re.IGNORECASE
+)
+_GRAMMAR_RE = re.compile(
+    r"(?:правило|используется|образуется|спрягается)[:\s]+([^.!?\n]+)", re.IGNORECASE
+)
+_EXAMPLE_RE = re.compile(r"(?:например|пример)[:\s]+([^.!?\n]+)", re.IGNORECASE)
+
+# Ключевые слова (от 4 символов) и границы предложений
+_WORD_RE = re.compile(r"\b\w{4,}\b")
+_SENT_SPLIT_RE = re.compile(r"[.!?]")
+
+
+def _find_evidence(words: Iterable[str], context: str, context_lower: str) -> str:
+    """
+    Находит предложение контекста, содержащее одно из слов.
+
+    Контекст не разбивается на список предложений: первое вхождение слова
+    ищется str.find, а границы предложения - вокруг найденной позиции.
+    Слова не содержат знаков конца предложения, поэтому результат
+    совпадает с поиском по разбитым на предложения строкам.
+    """
+    # lower() может менять длину строки (например, "İ"), тогда позиции
+    # в нижнем регистре не совпадают с исходными - ищем по предложениям
+    if len(context_lower) != len(context):
+        sentences = _SENT_SPLIT_RE.split(context)
+        for word in words:
+            for sent in sentences:
+                if word in sent.lower():
+                    return sent.strip()
+        return ""
+
+    for word in words:
+        pos = context_lower.find(word)
+        if pos < 0:
+            continue
+        start = max(context.rfind(mark, 0, pos) for mark in ".!?") + 1
+        end_match = _SENT_SPLIT_RE.search(context, pos)
+        end = end_match.start() if end_match else len(context)
+        return context[start:end].strip()
+    return ""
+
 
 @dataclass
 class VerificationResult:
@@ -70,27 +115,18 @@ class ChainOfVerification:
         Returns:
             Список утверждений (claims)
         """
-        claims = []
-
-        # 1. Предложения с переводами
-        translation_pattern = r"(?:перевод|французски|traduire)[:\s]+([^.!?\n]+)"
-        claims.extend(re.findall(translation_pattern, response, re.IGNORECASE))
-
-        # 2. Грамматические утверждения
-        grammar_pattern = r"(?:правило|используется|образуется|спрягается)[:\s]+([^.!?\n]+)"
-        claims.extend(re.findall(grammar_pattern, response, re.IGNORECASE))
-
-        # 3. Примеры
-        example_pattern = r"(?:например|пример)[:\s]+([^.!?\n]+)"
-        claims.extend(re.findall(example_pattern, response, re.IGNORECASE))
-
-        return list(set(claims))[:10]
-
-    def verify_claim(
-        self,
-        claim: str,
-        context: str
-    ) -> Tuple[bool, float, str]:
+        # dict сохраняет порядок появления; после 10 уникальных утверждений
+        # дальнейший поиск не нужен. Порядок шаблонов: переводы, грамматика, примеры
+        claims = {}
+        for pattern in (_TRANSLATION_RE, _GRAMMAR_RE, _EXAMPLE_RE):
+            for match in pattern.finditer(response):
+                claims[match.group(1)] = None
+                if len(claims) >= 10:
+                    return list(claims)
+
+        return list(claims)
+
+    def verify_claim(self, claim: str, context: str) -> Tuple[bool, float, str]:
         """
         Верифицирует отдельное утверждение.
 
@@ -99,14 +135,24 @@ class ChainOfVerification:
             context: Контекст для верификации
 
         Returns:
-            (is_verified, confidence, evidence)
+            (is_verified, confidence, evidence); evidence ищется только
+            для подтверждённых утверждений
         """
-        claim_lower = claim.lower()
         context_lower = context.lower()
+        context_words = frozenset(_WORD_RE.findall(context_lower))
+        return self._verify_prepared(claim, context, context_words, context_lower)
 
+    @staticmethod
+    def _verify_prepared(
+        claim: str,
+        context: str,
+        context_words: FrozenSet[str],
+        context_lower: str,
+        need_evidence: bool = True
+    ) -> Tuple[bool, float, str]:
+        """Верифицирует утверждение против заранее подготовленного контекста."""
         # Извлекаем ключевые слова
-        claim_words = set(re.findall(r"\b\w{4,}\b", claim_lower))
-        context_words = set(re.findall(r"\b\w{4,}\b", context_lower))
+        claim_words = set(_WORD_RE.findall(claim.lower()))
 
         # Пересечение
         overlap = claim_words & context_words
@@ -114,38 +160,89 @@ class ChainOfVerification:
         if len(claim_words) == 0:
             return True, 1.0, "Empty claim"
 
+        if not overlap:
+            return False, 0.0, ""
+
         overlap_ratio = len(overlap) / len(claim_words)
+        is_verified = overlap_ratio > 0.3
+        confidence = min(overlap_ratio * 1.5, 1.0)
+
+        if not need_evidence or not is_verified:
+            return is_verified, confidence, ""
 
         # Ищем прямое подтверждение в контексте
-        evidence = ""
-        for word in overlap:
-            sentences = re.split(r"[.!?]", context)
-            for sent in sentences:
-                if word in sent.lower():
-                    evidence = sent.strip()
-                    break
+        return is_verified, confidence, _find_evidence(overlap, context, context_lower)
+
+    @staticmethod
+    def _prepare_context(
+        context: Union[str, Sequence[PreparedDoc]]
+    ) -> Tuple[str, FrozenSet[str], str]:
+        """Возвращает текст контекста, его ключевые слова и нижний регистр."""
+        if isinstance(context, str):
+            context_lower = context.lower()
+            return context, frozenset(_WORD_RE.findall(context_lower)), context_lower
+
+        context_words = frozenset().union(*(doc.tokens for doc in context))
+        text = "\n\n".join(doc.raw for doc in context)
+        return text, context_words, text.lower()
+
+    def verify_claims_batch(
+        self,
+        claims: Sequence[str],
+        context: Union[str, Sequence[PreparedDoc]],
+        max_evidence: Optional[int] = None
+    ) -> List[Tuple[bool, float, str]]:
+        """
+        Верифицирует несколько утверждений против одного контекста.
 
-        is_verified = overlap_ratio > 0.3
-        confidence = min(overlap_ratio * 1.5, 1.0)
+        Контекст токенизируется и приводится к нижнему регистру один раз
+        для всех claims.
 
-        return is_verified, confidence, evidence
+        Args:
+            claims: Утверждения для проверки
+            context: Контекст (строка или подготовленные retrieved документы)
+            max_evidence: После скольких найденных подтверждений перестать
+                искать evidence (None - искать для всех)
+
+        Returns:
+            Список (is_verified, confidence, evidence) в порядке claims
+        """
+        context, context_words, context_lower = self._prepare_context(context)
+
+        results = []
+        evidence_found = 0
+        for claim in claims:
+            result = self._verify_prepared(
+                claim,
+                context,
+                context_words,
+                context_lower,
+                need_evidence=max_evidence is None or evidence_found < max_evidence
+            )
+            if result[0] and result[2]:
+                evidence_found += 1
+            results.append(result)
+
+        return results
 
     def run_verification(
         self,
         response: str,
-        context: str
+        context: Union[str, Sequence[PreparedDoc]]
     ) -> VerificationResult:
         """
         Выполняет полную верификацию ответа.
 
         Args:
             response: Ответ для верификации
-            context: Контекст (retrieved документы)
+            context: Контекст (строка или подготовленные retrieved документы)
 
         Returns:
             VerificationResult с результатами проверки
         """
         claims = self.extract_claims(response)
+        # В результат попадают не более 5 подтверждений
+        results = self.verify_claims_batch(claims, context, max_evidence=5)
 
         issues = []
         corrections = []
@@ -154,8 +251,7 @@ class ChainOfVerification:
         verified_count = 0
         total_confidence = 0.0
 
-        for claim in claims:
-            is_verified, confidence, evidence = self.verify_claim(claim, context)
+        for claim, (is_verified, confidence, evidence) in zip(claims, results):
             total_confidence += confidence
 
             if is_verified:
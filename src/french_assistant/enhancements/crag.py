@@ -8,12 +8,15 @@
 """
 
 import logging
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, List, Optional, Tuple, Union
 
-from .self_rag import SelfRAG, RetrievalQuality
+from .self_rag import PreparedDoc, SelfRAG, RetrievalQuality, prepare_documents
 
 logger = logging.getLogger(__name__)
 
+# Метка документов из fallback-знаний
+FALLBACK_PREFIX = "Базовые знания"
+
 
 class CorrectiveRAG:
     """
@@ -59,17 +62,26 @@ class CorrectiveRAG:
         self.self_rag = SelfRAG()
         self.fallback_knowledge = fallback_knowledge or self.DEFAULT_FALLBACK_KNOWLEDGE
 
+        # Документы fallback-знаний и ключи тем собираются один раз
+        self._fallback_docs = tuple(
+            f"[{FALLBACK_PREFIX}] {k}" for k in self.fallback_knowledge.values()
+        )
+        self._topic_keys = tuple(
+            (topic, tuple(topic.split()), doc)
+            for topic, doc in zip(self.fallback_knowledge, self._fallback_docs)
+        )
+
     def evaluate_retrieval_quality(
         self,
         query: str,
-        documents: List[str]
+        documents: List[Union[str, PreparedDoc]]
     ) -> RetrievalQuality:
         """
         Оценивает общее качество retrieved документов.
 
         Args:
             query: Запрос пользователя
-            documents: Список retrieved документов
+            documents: Список retrieved документов (тексты или PreparedDoc)
 
         Returns:
             Оценка качества (RetrievalQuality)
@@ -77,24 +89,22 @@ class CorrectiveRAG:
         if not documents:
             return RetrievalQuality.POOR
 
-        qualities = []
-        for doc in documents:
-            quality, _ = self.self_rag.assess_relevance(query, doc)
-            qualities.append(quality)
-
-        # Берём лучшее качество из топ-3
-        quality_order = [
-            RetrievalQuality.EXCELLENT,
-            RetrievalQuality.GOOD,
-            RetrievalQuality.PARTIAL,
-            RetrievalQuality.POOR
-        ]
+        # Запрос токенизируется один раз для всех документов
+        query_words = set(query.lower().split())
+        query_key_terms = {w for w in query_words if len(w) > 4}
 
-        for q in quality_order:
-            if q in qualities[:3]:
-                return q
+        # Учитываются только топ-3 документа; биты RetrievalQuality
+        # упорядочены от лучшего к худшему, поэтому лучшая оценка - минимум
+        best = RetrievalQuality.POOR
+        for doc in prepare_documents(documents[:3]):
+            quality, _ = self.self_rag.assess_relevance_tokens(
+                query_words, query_key_terms, doc.words
+            )
+            best = min(best, quality)
+            if best is RetrievalQuality.EXCELLENT:
+                break
 
-        return RetrievalQuality.POOR
+        return best
 
     def get_correction_strategy(self, quality: RetrievalQuality) -> str:
         """
@@ -140,11 +150,9 @@ class CorrectiveRAG:
             note = "Добавлена базовая информация для полноты ответа."
             query_lower = query.lower()
 
-            for topic, knowledge in self.fallback_knowledge.items():
-                if topic in query_lower or any(
-                    kw in query_lower for kw in topic.split()
-                ):
-                    documents.append(f"[Базовые знания] {knowledge}")
+            for topic, keywords, fallback_doc in self._topic_keys:
+                if topic in query_lower or any(kw in query_lower for kw in keywords):
+                    documents.append(fallback_doc)
                     break
 
             return documents, note
@@ -155,11 +163,7 @@ class CorrectiveRAG:
 
         elif strategy == "fallback":
             note = "Релевантная информация не найдена. Используются базовые знания."
-            fallback_docs = [
-                f"[Базовые знания] {k}"
-                for k in self.fallback_knowledge.values()
-            ]
-            return fallback_docs, note
+            return list(self._fallback_docs), note
 
         elif strategy == "clarify":
             note = "Найдена противоречивая информация. Требуется уточнение вопроса."
@@ -170,14 +174,16 @@ class CorrectiveRAG:
     def correct(
         self,
         query: str,
-        documents: List[str]
+        documents: List[Union[str, PreparedDoc]],
+        quality: Optional[RetrievalQuality] = None
     ) -> Tuple[List[str], Dict[str, Any]]:
         """
         Основной метод коррекции.
 
         Args:
             query: Запрос пользователя
-            documents: Retrieved документы
+            documents: Retrieved документы (тексты или PreparedDoc)
+            quality: Уже вычисленное качество retrieval (иначе оценивается здесь)
 
         Returns:
             (corrected_documents, correction_metadata)
@@ -187,24 +193,29 @@ class CorrectiveRAG:
             docs, meta = crag.correct("спряжение avoir", retrieved_docs)
             # meta = {"strategy": "supplement", "correction_applied": True, ...}
         """
-        # 1. Оценка качества
-        quality = self.evaluate_retrieval_quality(query, documents)
+        # 1. Оценка качества (если не передана вызывающим кодом);
+        # токенизируются только оцениваемые топ-3 документа
+        if quality is None:
+            quality = self.evaluate_retrieval_quality(query, documents)
 
         # 2. Определение стратегии
         strategy = self.get_correction_strategy(quality)
 
-        # 3. Применение коррекции
-        corrected_docs, note = self.apply_correction(query, documents, strategy)
+        # 3. Применение коррекции (нужен только исходный текст)
+        texts = [doc.raw if isinstance(doc, PreparedDoc) else doc for doc in documents]
+        corrected_docs, note = self.apply_correction(query, texts, strategy)
 
         metadata = {
-            "original_quality": quality.value,
+            "original_quality": quality.label,
             "strategy": strategy,
             "correction_applied": strategy != "none",
             "note": note,
+            # Метка fallback-документов: проверка без поиска подстроки в тексте
+            "fallback_marker": FALLBACK_PREFIX if strategy == "fallback" else None,
             "original_doc_count": len(documents),
             "corrected_doc_count": len(corrected_docs)
         }
 
-        logger.info(f"CRAG correction: {quality.value} -> {strategy}")
+        logger.info(f"CRAG correction: {quality.label} -> {strategy}")
 
         return corrected_docs, metadata
@@ -8,21 +8,82 @@
 4. Utility Token - оценка полезности ответа
 """
 
+import functools
 import re
 import logging
-from enum import Enum
-from typing import List, Tuple
+from enum import IntFlag
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple, Union
+
+# Aho–Corasick ищет все триггеры за один проход по запросу; без него
+# используется поиск подстрок по каждому триггеру
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
 
 logger = logging.getLogger(__name__)
 
+# Существенные слова ответа (кириллица и латиница с французскими диакритиками)
+_SUPPORT_WORD_RE = re.compile(r"\b[a-zа-яéèêëàâäùûüôöîïç]{4,}\b")
 
-class RetrievalQuality(Enum):
-    """Оценка качества retrieved документов."""
-    EXCELLENT = "excellent"  # Прямой ответ на вопрос
-    GOOD = "good"           # Релевантная информация
-    PARTIAL = "partial"     # Частично релевантная
-    POOR = "poor"           # Нерелевантная
-    AMBIGUOUS = "ambiguous" # Противоречивая информация
+# Тематические слова (от 4 символов)
+_WORD_RE = re.compile(r"\b\w{4,}\b")
+
+# Начиная с этого количества слов ответа один проход автомата по документам
+# выгоднее, чем поиск подстроки для каждого слова
+_SUPPORT_AUTOMATON_MIN_WORDS = 32
+
+
+class RetrievalQuality(IntFlag):
+    """
+    Оценка качества retrieved документов.
+
+    Значения - отдельные биты, упорядоченные от лучшего к худшему:
+    набор допустимых оценок проверяется одной битовой операцией
+    (quality & (EXCELLENT | GOOD)), а лучшая из оценок - это минимум.
+    """
+    EXCELLENT = 1   # Прямой ответ на вопрос
+    GOOD = 2        # Релевантная информация
+    PARTIAL = 4     # Частично релевантная
+    POOR = 8        # Нерелевантная
+    AMBIGUOUS = 16  # Противоречивая информация
+
+    @property
+    def label(self) -> str:
+        """Название оценки в нижнем регистре (для метаданных и логов)."""
+        return self.name.lower()
+
+
+@dataclass(frozen=True)
+class PreparedDoc:
+    """Документ с заранее вычисленными нижним регистром и токенами."""
+    raw: str
+    lower: str
+    words: FrozenSet[str]   # Слова через split() - для Jaccard
+    tokens: FrozenSet[str]  # Слова от 4 символов - для проверки терминов
+
+    @classmethod
+    def from_text(cls, text: str) -> "PreparedDoc":
+        lower = text.lower()
+        return cls(text, lower, frozenset(lower.split()), frozenset(_WORD_RE.findall(lower)))
+
+
+def prepare_documents(documents: Iterable[Union[str, PreparedDoc]]) -> List[PreparedDoc]:
+    """
+    Подготавливает документы один раз для всех этапов Self-RAG / CRAG / CoVe.
+
+    Args:
+        documents: Тексты документов или уже подготовленные документы
+
+    Returns:
+        Список PreparedDoc
+    """
+    return [
+        doc if isinstance(doc, PreparedDoc) else PreparedDoc.from_text(doc)
+        for doc in documents
+    ]
 
 
 class SelfRAG:
@@ -55,6 +116,41 @@ class SelfRAG:
             retrieval_triggers: Словарь триггеров для retrieval
         """
         self.retrieval_triggers = retrieval_triggers or self.DEFAULT_RETRIEVAL_TRIGGERS
+        self._trigger_automaton = self._build_trigger_automaton(self.retrieval_triggers)
+
+        # Классификация чистая функция запроса: повторы (ретраи, типовые
+        # приветствия) не пересчитываются
+        self._classify_cached = functools.lru_cache(maxsize=1024)(self._classify_retrieval_need)
+
+    def clear_cache(self) -> None:
+        """Очищает кэш оценки необходимости retrieval."""
+        self._classify_cached.cache_clear()
+
+    @staticmethod
+    def _build_trigger_automaton(triggers: Dict[str, List[str]]) -> Optional[object]:
+        """Строит автомат Aho–Corasick по триггерам (None, если недоступен)."""
+        if ahocorasick is None or not any(triggers.values()):
+            return None
+
+        automaton = ahocorasick.Automaton()
+        for label, words in triggers.items():
+            for word in words:
+                automaton.add_word(word, (label, word))
+        automaton.make_automaton()
+        return automaton
+
+    def _count_triggers(self, query_lower: str) -> Counter:
+        """Считает сработавшие триггеры каждой группы (каждый триггер - один раз)."""
+        if self._trigger_automaton is not None:
+            matched = {match for _, match in self._trigger_automaton.iter(query_lower)}
+            return Counter(label for label, _ in matched)
+
+        return Counter(
+            label
+            for label, words in self.retrieval_triggers.items()
+            for t in words
+            if t in query_lower
+        )
 
     def assess_retrieval_need(self, query: str) -> Tuple[bool, float]:
         """
@@ -66,22 +162,23 @@ class SelfRAG:
         Returns:
             (needs_retrieval, confidence)
         """
+        return self._classify_cached(query)
+
+    def _classify_retrieval_need(self, query: str) -> Tuple[bool, float]:
+        """Некэшированная классификация запроса по триггерам."""
         query_lower = query.lower()
 
         # Подсчёт триггеров
-        high_triggers = sum(
-            1 for t in self.retrieval_triggers["high"]
-            if t in query_lower
-        )
-        low_triggers = sum(
-            1 for t in self.retrieval_triggers["low"]
-            if t in query_lower
-        )
+        counts = self._count_triggers(query_lower)
+        high_triggers = counts["high"]
+        low_triggers = counts["low"]
 
+        # Уверенность считается в процентах (целых), а в float переводится
+        # только на выходе: 0.6 + 3 * 0.1 дало бы 0.8999999999999999
         if low_triggers > high_triggers:
             return False, 0.9
         elif high_triggers > 0:
-            return True, min(0.6 + high_triggers * 0.1, 1.0)
+            return True, min(60 + high_triggers * 10, 100) / 100
         else:
             # По умолчанию retrieval нужен
             return True, 0.7
@@ -102,18 +199,38 @@ class SelfRAG:
             (quality, confidence_score)
         """
         query_words = set(query.lower().split())
+        query_key_terms = {w for w in query_words if len(w) > 4}
         doc_words = set(document.lower().split())
 
-        # Jaccard similarity
+        return self.assess_relevance_tokens(query_words, query_key_terms, doc_words)
+
+    def assess_relevance_tokens(
+        self,
+        query_words: Set[str],
+        query_key_terms: Set[str],
+        doc_words: Set[str]
+    ) -> Tuple[RetrievalQuality, float]:
+        """
+        Оценивает релевантность по заранее токенизированным запросу и документу.
+
+        Позволяет токенизировать запрос один раз при оценке нескольких документов.
+
+        Args:
+            query_words: Слова запроса (в нижнем регистре)
+            query_key_terms: Ключевые термины запроса (длиннее 4 символов)
+            doc_words: Слова документа (в нижнем регистре)
+
+        Returns:
+            (quality, confidence_score)
+        """
+        # Jaccard similarity; размер объединения выводится из размеров множеств,
+        # без построения множества-объединения размером с документ
         intersection = len(query_words & doc_words)
-        union = len(query_words | doc_words)
+        union = len(query_words) + len(doc_words) - intersection
         jaccard = intersection / max(union, 1)
 
         # Проверяем наличие ключевых терминов запроса
-        key_terms_found = sum(
-            1 for w in query_words
-            if len(w) > 4 and w in document.lower()
-        )
+        key_terms_found = len(query_key_terms & doc_words)
 
         # Оценка качества
         if jaccard > 0.3 and key_terms_found >= 2:
@@ -128,28 +245,33 @@ class SelfRAG:
     def assess_support(
         self,
         response: str,
-        documents: List[str]
+        documents: List[Union[str, PreparedDoc]]
     ) -> Tuple[bool, float]:
         """
         Оценивает, поддерживается ли ответ документами.
 
         Args:
             response: Сгенерированный ответ
-            documents: Список документов-источников
+            documents: Список документов-источников (тексты или PreparedDoc)
 
         Returns:
             (is_supported, support_ratio)
         """
-        combined_docs = " ".join(documents).lower()
+        combined_docs = " ".join(doc.lower for doc in prepare_documents(documents))
         response_lower = response.lower()
 
         # Извлекаем существенные слова из ответа
-        response_words = set(
-            re.findall(r"\b[a-zа-яéèêëàâäùûüôöîïç]{4,}\b", response_lower)
-        )
+        response_words = set(_SUPPORT_WORD_RE.findall(response_lower))
 
         # Считаем, сколько из них есть в документах
-        supported = sum(1 for w in response_words if w in combined_docs)
+        if ahocorasick is not None and len(response_words) > _SUPPORT_AUTOMATON_MIN_WORDS:
+            automaton = ahocorasick.Automaton()
+            for w in response_words:
+                automaton.add_word(w, w)
+            automaton.make_automaton()
+            supported = len({w for _, w in automaton.iter(combined_docs)})
+        else:
+            supported = sum(1 for w in response_words if w in combined_docs)
 
         support_ratio = supported / max(len(response_words), 1)
 
@@ -177,8 +299,8 @@ class SelfRAG:
         )
 
         # Проверяем, что ответ затрагивает тему запроса
-        query_topics = set(re.findall(r"\b\w{4,}\b", query.lower()))
-        response_topics = set(re.findall(r"\b\w{4,}\b", response.lower()))
+        query_topics = set(_WORD_RE.findall(query.lower()))
+        response_topics = set(_WORD_RE.findall(response.lower()))
 
         topic_coverage = len(query_topics & response_topics) / max(len(query_topics), 1)
 
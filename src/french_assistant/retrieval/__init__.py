@@ -5,14 +5,17 @@
 - QueryExpander: Расширение поисковых запросов
 - VectorStoreManager: Управление векторным хранилищем
 - EnhancedRetriever: Улучшенный ретривер с MMR и multi-query
+- SemanticCache: Кэш результатов поиска по сходству запросов
 """
 
 from .query_expansion import QueryExpander
 from .vectorstore import VectorStoreManager
 from .retriever import EnhancedRetriever
+from .semantic_cache import SemanticCache
 
 __all__ = [
     "QueryExpander",
     "VectorStoreManager",
     "EnhancedRetriever",
+    "SemanticCache",
 ]
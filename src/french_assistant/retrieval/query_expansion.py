@@ -7,8 +7,20 @@
 3. Multi-query generation - генерация нескольких вариантов запроса
 """
 
+import functools
+import hashlib
 import logging
-from typing import List, Optional
+import os
+import re
+from pathlib import Path
+from typing import List, Optional, Tuple, Union
+
+# Aho–Corasick находит термины синонимов за один проход независимо от размера
+# словаря; без него используется регулярное выражение с альтернацией
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
 
 logger = logging.getLogger(__name__)
 
@@ -32,16 +44,66 @@ class QueryExpander:
         "идиома": ["выражение", "фразеологизм", "idiome", "expression"],
     }
 
-    def __init__(self, llm=None, synonyms: dict = None):
+    def __init__(
+        self,
+        llm=None,
+        synonyms: dict = None,
+        hyde_cache_dir: Optional[Union[str, Path]] = None
+    ):
         """
         Инициализирует расширитель запросов.
 
         Args:
             llm: LLM для генерации HyDE документов (опционально)
             synonyms: Словарь синонимов для расширения (опционально)
+            hyde_cache_dir: Директория дискового кэша HyDE-документов
+                (например, ~/.cache/french_assistant/hyde); None - без диска
         """
         self.llm = llm
         self.synonyms = synonyms or self.DEFAULT_SYNONYMS
+        self.hyde_cache_dir = Path(hyde_cache_dir).expanduser() if hyde_cache_dir else None
+
+        # Все термины ищутся за один проход; длинные термины побеждают
+        # перекрывающиеся с ними короткие
+        self._synonyms_automaton = self._build_synonyms_automaton(self.synonyms)
+        self._synonyms_re = None
+        if self._synonyms_automaton is None:
+            self._synonyms_re = re.compile("|".join(
+                re.escape(term)
+                for term in sorted(self.synonyms, key=len, reverse=True)
+            ))
+
+        # Кэши на экземпляр: повторные запросы в чате не пересчитываются,
+        # а HyDE не обращается к LLM повторно
+        self._synonyms_cached = functools.lru_cache(maxsize=512)(self._expand_with_synonyms)
+        self._hyde_cached = functools.lru_cache(maxsize=256)(self._generate_hyde_llm)
+        self._expand_cached = functools.lru_cache(maxsize=1024)(self._expand_query)
+
+    def clear_cache(self) -> None:
+        """Очищает кэши расширения запросов и HyDE."""
+        self._synonyms_cached.cache_clear()
+        self._hyde_cached.cache_clear()
+        self._expand_cached.cache_clear()
+
+    @staticmethod
+    def _build_synonyms_automaton(synonyms: dict) -> Optional[object]:
+        """Строит автомат Aho–Corasick по терминам словаря (None, если недоступен)."""
+        if ahocorasick is None or not synonyms:
+            return None
+
+        automaton = ahocorasick.Automaton()
+        for term in synonyms:
+            automaton.add_word(term, term)
+        automaton.make_automaton()
+        return automaton
+
+    def _find_synonym_terms(self, query_lower: str) -> dict:
+        """Находит термины словаря в запросе в порядке появления (без повторов)."""
+        if self._synonyms_automaton is not None:
+            # iter_long - самые длинные непересекающиеся совпадения, как у regex
+            matches = self._synonyms_automaton.iter_long(query_lower)
+            return dict.fromkeys(term for _, term in matches)
+        return dict.fromkeys(m.group(0) for m in self._synonyms_re.finditer(query_lower))
 
     def expand_with_synonyms(self, query: str) -> List[str]:
         """
@@ -53,15 +115,20 @@ class QueryExpander:
         Returns:
             Список вариантов запроса с синонимами
         """
-        expanded = [query]
+        return list(self._synonyms_cached(query))
+
+    def _expand_with_synonyms(self, query: str) -> Tuple[str, ...]:
+        """Расширяет запрос синонимами (без кэша)."""
         query_lower = query.lower()
+        hits = self._find_synonym_terms(query_lower)
 
-        for term, syns in self.synonyms.items():
-            if term in query_lower:
-                for syn in syns:
-                    expanded.append(query_lower.replace(term, syn))
+        # dict сохраняет порядок: исходный запрос всегда остаётся первым
+        expanded = {query: None}
+        for term in hits:
+            for syn in self.synonyms[term]:
+                expanded[query_lower.replace(term, syn)] = None
 
-        return list(set(expanded))[:4]
+        return tuple(expanded)[:4]
 
     def generate_hyde_document(self, query: str) -> str:
         """
@@ -78,11 +145,8 @@ class QueryExpander:
             Гипотетический документ
         """
         if self.llm:
-            prompt = f"""Напиши краткий информативный абзац, который бы отвечал на вопрос:
-            "{query}"
-            Ответ должен быть на русском языке и касаться французской грамматики или перевода."""
             try:
-                return self.llm.predict(prompt)
+                return self._hyde_cached(query)
             except Exception as e:
                 logger.warning(f"HyDE generation failed: {e}")
 
@@ -92,6 +156,52 @@ class QueryExpander:
             f"Грамматические правила и примеры использования."
         )
 
+    def _generate_hyde_llm(self, query: str) -> str:
+        """
+        Генерирует HyDE-документ через LLM (ошибки не кэшируются).
+
+        При заданном hyde_cache_dir ответ LLM сохраняется на диск и
+        переживает перезапуск процесса.
+        """
+        cache_path = self._hyde_cache_path(query)
+        if cache_path is not None:
+            try:
+                return cache_path.read_text(encoding="utf-8")
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"HyDE disk cache read failed: {e}")
+
+        document = self._call_hyde_llm(query)
+
+        if cache_path is not None:
+            try:
+                cache_path.parent.mkdir(parents=True, exist_ok=True)
+                # Запись через временный файл: параллельный читатель
+                # не увидит недописанный документ
+                tmp_path = cache_path.with_suffix(f".{os.getpid()}.tmp")
+                tmp_path.write_text(document, encoding="utf-8")
+                os.replace(tmp_path, cache_path)
+            except OSError as e:
+                logger.warning(f"HyDE disk cache write failed: {e}")
+
+        return document
+
+    def _hyde_cache_path(self, query: str) -> Optional[Path]:
+        """Путь к файлу дискового кэша HyDE (ключ - модель и запрос)."""
+        if self.hyde_cache_dir is None:
+            return None
+        model = getattr(self.llm, "model_name", None) or getattr(self.llm, "model", "")
+        key = f"{type(self.llm).__name__}:{model}\n{query}"
+        return self.hyde_cache_dir / f"{hashlib.sha256(key.encode('utf-8')).hexdigest()}.txt"
+
+    def _call_hyde_llm(self, query: str) -> str:
+        """Запрашивает HyDE-документ у LLM."""
+        prompt = f"""Напиши краткий информативный абзац, который бы отвечал на вопрос:
+            "{query}"
+            Ответ должен быть на русском языке и касаться французской грамматики или перевода."""
+        return self.llm.predict(prompt)
+
     def expand_query(
         self,
         query: str,
@@ -109,13 +219,26 @@ class QueryExpander:
         Returns:
             Список расширенных вариантов запроса
         """
+        if use_hyde:
+            # HyDE-документ кэшируется в _hyde_cached, а шаблонный fallback
+            # после ошибки LLM не должен запоминаться - результат не мемоизируем
+            return list(self._expand_query(query, use_hyde, max_variants))
+        return list(self._expand_cached(query, use_hyde, max_variants))
+
+    def _expand_query(
+        self,
+        query: str,
+        use_hyde: bool,
+        max_variants: int
+    ) -> Tuple[str, ...]:
+        """Комплексное расширение запроса (без кэша)."""
         queries = self.expand_with_synonyms(query)
 
         if use_hyde:
             hyde_doc = self.generate_hyde_document(query)
             queries.append(hyde_doc)
 
-        result = queries[:max_variants]
+        result = tuple(queries[:max_variants])
         logger.debug(f"Query expanded: {query} -> {len(result)} variants")
 
         return result
@@ -8,19 +8,50 @@
 """
 
 import hashlib
+import heapq
 import logging
+import operator
+import re
+import threading
 import time
-from typing import List, Optional
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple, Union
 
+# xxh3 заметно быстрее md5; fallback на blake2b из stdlib
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+import numpy as np
 from langchain_core.documents import Document
 from langchain_community.vectorstores import Chroma
+from langchain_community.vectorstores.utils import maximal_marginal_relevance
 
 from ..core.config import RetrievalConfig
 from ..utils.tracing import TracingManager
 from .query_expansion import QueryExpander
+from .semantic_cache import SemanticCache
 
 logger = logging.getLogger(__name__)
 
+# Термины для ранжирования (слова без пунктуации)
+_TERM_RE = re.compile(r"\w+")
+
+
+def _normalize_query(query: str) -> str:
+    """Нормализует запрос для точного кэша: регистр и пробелы."""
+    return " ".join(query.lower().split())
+
+
+def _content_key(text: str) -> Union[int, bytes]:
+    """Короткий некриптографический ключ содержимого для дедупликации."""
+    data = text.encode()
+    if xxhash is not None:
+        return xxhash.xxh3_64_intdigest(data)
+    return hashlib.blake2b(data, digest_size=8).digest()
+
 
 class EnhancedRetriever:
     """
@@ -65,10 +96,25 @@ class EnhancedRetriever:
         )
 
         # Query expander
-        self.query_expander = QueryExpander()
+        self.query_expander = QueryExpander(hyde_cache_dir=self.config.hyde_cache_dir)
+
+        # Точный кэш по нормализованному запросу и флагам поиска; retrieve
+        # вызывается из нескольких потоков, поэтому LRU меняется под блокировкой
+        self._exact_cache: "OrderedDict[bytes, List[Document]]" = OrderedDict()
+        self._exact_lock = threading.Lock()
+
+        # Семантические кэши результатов (отдельный на каждую комбинацию флагов)
+        self._semantic_caches: Dict[Tuple[bool, bool], SemanticCache] = {}
 
         logger.info("EnhancedRetriever initialized with MMR search")
 
+    def clear_cache(self) -> None:
+        """Очищает кэши результатов поиска (например, после добавления документов)."""
+        with self._exact_lock:
+            self._exact_cache.clear()
+        for cache in list(self._semantic_caches.values()):
+            cache.clear()
+
     def _log_event(
         self,
         event_type: str,
@@ -107,6 +153,25 @@ class EnhancedRetriever:
         """
         start_time = time.time()
 
+        # 0. Точный кэш: повторно введённый вопрос не требует даже эмбеддинга
+        exact_key = hashlib.sha256(
+            f"{use_expansion:d}{use_hyde:d}{_normalize_query(query)}".encode()
+        ).digest()
+        cached_docs = self._lookup_exact(exact_key)
+        if cached_docs is not None:
+            self._log_event("exact_cache_hit", query, f"{len(cached_docs)} docs")
+            return list(cached_docs)
+
+        # Семантический кэш: перефразированный запрос отдаёт готовый результат
+        cache, query_embedding = self._get_semantic_cache(use_expansion, use_hyde), None
+        if cache is not None:
+            query_embedding = self.vectorstore.embeddings.embed_query(query)
+            cached_docs = cache.lookup(query_embedding)
+            if cached_docs is not None:
+                self._log_event("semantic_cache_hit", query, f"{len(cached_docs)} docs")
+                self._remember_exact(exact_key, cached_docs)
+                return cached_docs
+
         # 1. Расширяем запрос
         if use_expansion:
             expanded_queries = self.query_expander.expand_query(
@@ -127,13 +192,18 @@ class EnhancedRetriever:
         all_docs = []
         seen_contents = set()
 
-        for q in expanded_queries:
-            docs = self.base_retriever.get_relevant_documents(q)
+        # Эмбеддинг исходного запроса уже посчитан для семантического кэша
+        known_embeddings = {query: query_embedding} if query_embedding is not None else None
+        for docs in self._mmr_search_batch(expanded_queries, known_embeddings):
             for doc in docs:
                 # Дедупликация по содержимому
-                content_hash = hashlib.md5(doc.page_content.encode()).hexdigest()
+                content_hash = _content_key(doc.page_content)
                 if content_hash not in seen_contents:
                     seen_contents.add(content_hash)
+                    # Термины документа извлекаются один раз для ранжирования
+                    doc.metadata["_terms"] = frozenset(
+                        _TERM_RE.findall(doc.page_content.lower())
+                    )
                     all_docs.append(doc)
 
         self._log_event(
@@ -143,27 +213,145 @@ class EnhancedRetriever:
         )
 
         # 3. Ранжирование по релевантности
-        scored_docs = self._rank_documents(query, all_docs)
+        top_k = self.config.top_k_final
+        scored_docs = self._rank_documents(query, all_docs, top_k=top_k)
 
         # 4. Возвращаем топ-k
-        top_k = self.config.top_k_final
-        result_docs = [doc for _, doc in scored_docs[:top_k]]
+        result_docs = [doc for _, doc in scored_docs]
+        for doc in result_docs:
+            doc.metadata.pop("_terms", None)
+
+        if cache is not None:
+            cache.add(query_embedding, result_docs)
+        self._remember_exact(exact_key, result_docs)
 
         duration = (time.time() - start_time) * 1000
         self._log_event(
             "retrieval_complete",
             query,
             f"{len(result_docs)} final docs",
-            {"scores": [s for s, _ in scored_docs[:top_k]]},
+            {"scores": [s for s, _ in scored_docs]},
             duration
         )
 
         return result_docs
 
+    def _lookup_exact(self, key: bytes) -> Optional[List[Document]]:
+        """Возвращает результат из точного кэша, отмечая его как недавний."""
+        with self._exact_lock:
+            documents = self._exact_cache.get(key)
+            if documents is not None:
+                self._exact_cache.move_to_end(key)
+        return documents
+
+    def _remember_exact(self, key: bytes, documents: List[Document]) -> None:
+        """Сохраняет копию результата в точный кэш, вытесняя самый старый."""
+        if self.config.exact_cache_size <= 0:
+            return
+
+        entry = list(documents)
+        with self._exact_lock:
+            self._exact_cache[key] = entry
+            self._exact_cache.move_to_end(key)
+            if len(self._exact_cache) > self.config.exact_cache_size:
+                self._exact_cache.popitem(last=False)
+
+    def _get_semantic_cache(
+        self,
+        use_expansion: bool,
+        use_hyde: bool
+    ) -> Optional[SemanticCache]:
+        """Возвращает семантический кэш для флагов поиска (None, если отключён)."""
+        if self.config.semantic_cache_size <= 0:
+            return None
+        if getattr(self.vectorstore, "embeddings", None) is None:
+            return None
+
+        key = (use_expansion, use_hyde)
+        cache = self._semantic_caches.get(key)
+        if cache is None:
+            # setdefault: при гонке потоков все получат один и тот же кэш
+            cache = self._semantic_caches.setdefault(key, SemanticCache(
+                max_size=self.config.semantic_cache_size,
+                threshold=self.config.semantic_cache_threshold
+            ))
+        return cache
+
+    def _mmr_search_batch(
+        self,
+        queries: List[str],
+        known_embeddings: Optional[Dict[str, List[float]]] = None
+    ) -> List[List[Document]]:
+        """
+        MMR-поиск сразу по нескольким запросам.
+
+        Запросы эмбеддятся через embed_query (асимметричные модели кодируют
+        запросы и документы по-разному) и отправляются в ChromaDB одним
+        вызовом; MMR применяется к кандидатам каждого запроса, документы
+        возвращаются в порядке выбора MMR, как в Chroma.max_marginal_relevance_search.
+
+        Args:
+            queries: Варианты запроса
+            known_embeddings: Уже посчитанные эмбеддинги запросов (опционально)
+
+        Returns:
+            Списки документов для каждого запроса
+        """
+        embeddings = getattr(self.vectorstore, "embeddings", None)
+        collection = getattr(self.vectorstore, "_collection", None)
+        if embeddings is None or collection is None:
+            return self._search_each(queries)
+
+        known_embeddings = known_embeddings or {}
+        missing = [q for q in queries if q not in known_embeddings]
+        computed = {q: embeddings.embed_query(q) for q in missing}
+        query_embeddings = [
+            known_embeddings[q] if q in known_embeddings else computed[q]
+            for q in queries
+        ]
+        results = collection.query(
+            query_embeddings=query_embeddings,
+            n_results=self.config.fetch_k,
+            include=["metadatas", "documents", "embeddings"]
+        )
+
+        batch = []
+        for i, query_embedding in enumerate(query_embeddings):
+            selected = maximal_marginal_relevance(
+                np.array(query_embedding, dtype=np.float32),
+                results["embeddings"][i],
+                k=self.config.k,
+                lambda_mult=self.config.lambda_mult
+            )
+            documents = results["documents"][i]
+            metadatas = results["metadatas"][i]
+            batch.append([
+                Document(page_content=documents[j], metadata=metadatas[j] or {})
+                for j in selected
+            ])
+
+        return batch
+
+    def _search_each(self, queries: List[str]) -> List[List[Document]]:
+        """
+        Поиск через базовый ретривер, по запросу на вызов.
+
+        Используется, когда хранилище не даёт батчевого доступа. Запросы
+        выполняются параллельно (ожидание эмбеддингов и хранилища отпускает
+        GIL), если хранилище потокобезопасно - см. config.parallel_queries.
+        """
+        search = self.base_retriever.get_relevant_documents
+        if not self.config.parallel_queries or len(queries) < 2:
+            return [search(q) for q in queries]
+
+        with ThreadPoolExecutor(max_workers=min(8, len(queries))) as executor:
+            return list(executor.map(search, queries))
+
     def _rank_documents(
         self,
         query: str,
-        documents: List[Document]
+        documents: List[Document],
+        top_k: Optional[int] = None
     ) -> List[tuple]:
         """
         Ранжирует документы по релевантности.
@@ -173,18 +361,21 @@ class EnhancedRetriever:
         Args:
             query: Исходный запрос
             documents: Список документов для ранжирования
+            top_k: Вернуть только лучшие top_k документов (опционально)
 
         Returns:
             Список кортежей (score, document), отсортированный по убыванию score
         """
         scored_docs = []
-        query_terms = set(query.lower().split())
+        query_terms = frozenset(_TERM_RE.findall(query.lower()))
 
         for doc in documents:
-            content_lower = doc.page_content.lower()
+            doc_terms = doc.metadata.get("_terms")
+            if doc_terms is None:
+                doc_terms = frozenset(_TERM_RE.findall(doc.page_content.lower()))
 
             # Подсчёт совпадений с терминами запроса
-            term_score = sum(1 for term in query_terms if term in content_lower)
+            term_score = len(query_terms & doc_terms)
 
             # Бонус за длину (но не слишком длинные)
             length_score = min(len(doc.page_content) / 500, 1.0)
@@ -192,9 +383,13 @@ class EnhancedRetriever:
             final_score = term_score + length_score * 0.5
             scored_docs.append((final_score, doc))
 
-        # Сортировка по убыванию score
-        scored_docs.sort(key=lambda x: x[0], reverse=True)
+        # Сортировка по убыванию score; для top_k достаточно частичной выборки
+        # (порядок при равных score тот же, что у sorted)
+        by_score = operator.itemgetter(0)
+        if top_k is not None:
+            return heapq.nlargest(top_k, scored_docs, key=by_score)
 
+        scored_docs.sort(key=by_score, reverse=True)
         return scored_docs
 
     def similarity_search(
@@ -6,10 +6,15 @@
 - Загрузка и индексация документов
 """
 
+import functools
+import importlib.metadata
+import importlib.util
+import itertools
 import logging
 import os
+import re
 from pathlib import Path
-from typing import List, Optional
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
 
 from langchain_core.documents import Document
 from langchain_text_splitters import RecursiveCharacterTextSplitter
@@ -27,6 +32,103 @@ from ..core.config import VectorDBConfig, ChunkingConfig
 logger = logging.getLogger(__name__)
 
 
+@functools.lru_cache(maxsize=4)
+def _load_embeddings(
+    model_name: str,
+    device: str,
+    lazy_weights: bool = False,
+    quantize: bool = False,
+    backend: str = "torch",
+    normalize: bool = True
+) -> HuggingFaceEmbeddings:
+    """
+    Загружает модель эмбеддингов.
+
+    Результат кэшируется по всем параметрам: менеджеры с одинаковой
+    конфигурацией эмбеддингов используют один экземпляр вместо повторной
+    загрузки весов.
+
+    backend="onnx" запускает модель через ONNX Runtime (sentence-transformers
+    сам экспортирует её при первой загрузке; нужен optimum[onnxruntime]).
+    """
+    logger.info(f"Loading embeddings model: {model_name} (backend={backend})")
+
+    # Ядро пакета допускает sentence-transformers>=2.2; новые возможности
+    # (экстры onnx и speedups) требуют более свежей версии
+    st_version = _sentence_transformers_version()
+    if backend != "torch" and st_version < (3, 2):
+        logger.warning(
+            f"backend={backend} требует sentence-transformers>=3.2 "
+            f"(установлена {'.'.join(map(str, st_version))}), используется torch. "
+            "Установите: pip install 'french-assistant[onnx]'"
+        )
+        backend = "torch"
+    if lazy_weights and backend == "torch" and st_version < (3, 0):
+        logger.warning(
+            "lazy_weights требует sentence-transformers>=3.0, отключён. "
+            "Установите: pip install 'french-assistant[speedups]'"
+        )
+        lazy_weights = False
+
+    model_kwargs = {"device": device}
+    if backend != "torch":
+        model_kwargs["backend"] = backend
+        if quantize:
+            logger.warning("INT8 quantization applies to the torch backend only, skipped")
+            quantize = False
+    elif lazy_weights:
+        if importlib.util.find_spec("accelerate") is not None:
+            # Модель создаётся на meta-устройстве, а веса присваиваются
+            # напрямую из mmap-файла, без промежуточной копии в памяти
+            model_kwargs["model_kwargs"] = {"low_cpu_mem_usage": True}
+        else:
+            logger.warning(
+                "accelerate не установлен, lazy_weights отключён. "
+                "Установите: pip install accelerate"
+            )
+
+    embeddings = HuggingFaceEmbeddings(
+        model_name=model_name,
+        model_kwargs=model_kwargs,
+        encode_kwargs={"normalize_embeddings": normalize}
+    )
+
+    if quantize:
+        _quantize_dynamic_int8(embeddings, device)
+
+    return embeddings
+
+
+def _sentence_transformers_version() -> Tuple[int, ...]:
+    """Возвращает (major, minor) установленного sentence-transformers."""
+    try:
+        version = importlib.metadata.version("sentence-transformers")
+    except importlib.metadata.PackageNotFoundError:
+        return (0, 0)
+    return tuple(int(part) for part in re.findall(r"\d+", version)[:2])
+
+
+def _quantize_dynamic_int8(embeddings: HuggingFaceEmbeddings, device: str) -> None:
+    """
+    Квантизует Linear-слои SentenceTransformer в INT8 (динамическая квантизация).
+
+    Ускоряет эмбеддинг на CPU примерно вдвое при потере качества около 1%.
+    Работает только на CPU; на других устройствах модель остаётся FP32.
+    """
+    if device != "cpu":
+        logger.warning(f"INT8 quantization is CPU-only, skipped for device={device}")
+        return
+
+    import torch
+
+    # langchain_huggingface хранит модель в _client, langchain_community - в client
+    model = getattr(embeddings, "_client", None) or embeddings.client
+    torch.ao.quantization.quantize_dynamic(
+        model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True
+    )
+    logger.info("Embeddings model quantized to INT8")
+
+
 class VectorStoreManager:
     """
     Менеджер векторного хранилища.
@@ -42,6 +144,22 @@ class VectorStoreManager:
         retriever = vectorstore.as_retriever()
     """
 
+    # (маркер в пути источника, тема, подтема); первое совпадение побеждает
+    _TOPIC_MAP = (
+        ("grammar_verbs", "grammar", "verbs"),
+        ("grammar_articles", "grammar", "articles"),
+        ("idioms", "idioms", None),
+        ("translation", "translation", None),
+    )
+
+    # (маркер в тексте, сложность) в порядке убывания сложности
+    _DIFFICULTY_MAP = (
+        ("subjonctif", "advanced"),
+        ("conditionnel", "advanced"),
+        ("passé composé", "intermediate"),
+        ("imparfait", "intermediate"),
+    )
+
     def __init__(
         self,
         config: VectorDBConfig = None,
@@ -60,6 +178,9 @@ class VectorStoreManager:
         self._embeddings = None
         self._vectorstore = None
 
+        # Обработчики, вызываемые после add_documents (сброс кэшей поиска)
+        self._on_documents_added: List[Callable[[], None]] = []
+
     @property
     def embeddings(self) -> HuggingFaceEmbeddings:
         """Возвращает инициализированные эмбеддинги (lazy loading)."""
@@ -76,15 +197,13 @@ class VectorStoreManager:
 
     def _init_embeddings(self) -> HuggingFaceEmbeddings:
         """Инициализирует мультиязычные эмбеддинги."""
-        model_name = self.config.embeddings.model
-        device = self.config.embeddings.device
-
-        logger.info(f"Loading embeddings model: {model_name}")
-
-        return HuggingFaceEmbeddings(
-            model_name=model_name,
-            model_kwargs={"device": device},
-            encode_kwargs={"normalize_embeddings": True}
+        return _load_embeddings(
+            self.config.embeddings.model,
+            self.config.embeddings.device,
+            self.config.embeddings.lazy_weights,
+            self.config.embeddings.quantize,
+            self.config.embeddings.backend,
+            self.config.embeddings.normalize
         )
 
     def _init_vectorstore(self) -> Chroma:
@@ -103,16 +222,18 @@ class VectorStoreManager:
 
         # Создаём новую базу
         logger.info("Creating new vectorstore...")
-        documents = self.load_knowledge_base()
-
-        vectorstore = Chroma.from_documents(
-            documents=documents,
-            embedding=self.embeddings,
+        vectorstore = Chroma(
             persist_directory=persist_dir,
+            embedding_function=self.embeddings,
             collection_name=collection_name
         )
 
-        logger.info(f"Vectorstore created with {len(documents)} documents")
+        # Chunks идут потоком split -> enrich -> вставка батчами,
+        # полный список chunks в памяти не собирается
+        raw_docs = self._load_raw_documents()
+        added = self._add_in_batches(vectorstore, self._iter_enriched_chunks(raw_docs))
+
+        logger.info(f"Vectorstore created with {added} documents")
         return vectorstore
 
     def load_knowledge_base(
@@ -128,32 +249,46 @@ class VectorStoreManager:
         Returns:
             Список обработанных документов
         """
-        # Загрузка markdown файлов
+        raw_docs = self._load_raw_documents(kb_path)
+        documents = list(self._iter_enriched_chunks(raw_docs))
+
+        logger.info(f"Split into {len(documents)} chunks with metadata")
+        return documents
+
+    def _load_raw_documents(self, kb_path: str = "data/knowledge_base") -> List[Document]:
+        """Загружает markdown-файлы базы знаний без разбиения."""
+        # Чтение I/O-bound, поэтому в потоках
         loader = DirectoryLoader(
             kb_path,
             glob="**/*.md",
             loader_cls=TextLoader,
-            loader_kwargs={"encoding": "utf-8"}
+            loader_kwargs={"encoding": "utf-8"},
+            use_multithreading=True,
+            max_concurrency=os.cpu_count() or 8,
+            show_progress=False
         )
 
         raw_docs = loader.load()
         logger.info(f"Loaded {len(raw_docs)} raw documents")
+        return raw_docs
 
-        # Разбиение на chunks
+    def _iter_enriched_chunks(self, raw_docs: Iterable[Document]) -> Iterator[Document]:
+        """
+        Разбивает документы на chunks и обогащает метаданными за один проход.
+
+        Документы разбиваются по одному, поэтому в памяти держатся только
+        chunks текущего файла.
+        """
         splitter = RecursiveCharacterTextSplitter(
             chunk_size=self.chunking_config.chunk_size,
             chunk_overlap=self.chunking_config.chunk_overlap,
             separators=self.chunking_config.separators
         )
 
-        documents = splitter.split_documents(raw_docs)
-
-        # Добавляем метаданные
-        for doc in documents:
-            self._enrich_metadata(doc)
-
-        logger.info(f"Split into {len(documents)} chunks with metadata")
-        return documents
+        for raw_doc in raw_docs:
+            for chunk in splitter.split_documents([raw_doc]):
+                self._enrich_metadata(chunk)
+                yield chunk
 
     def _enrich_metadata(self, doc: Document) -> None:
         """Обогащает документ метаданными."""
@@ -161,24 +296,19 @@ class VectorStoreManager:
         content = doc.page_content.lower()
 
         # Определяем тему по источнику
-        if "grammar_verbs" in source:
-            doc.metadata["topic"] = "grammar"
-            doc.metadata["subtopic"] = "verbs"
-        elif "grammar_articles" in source:
-            doc.metadata["topic"] = "grammar"
-            doc.metadata["subtopic"] = "articles"
-        elif "idioms" in source:
-            doc.metadata["topic"] = "idioms"
-        elif "translation" in source:
-            doc.metadata["topic"] = "translation"
+        for marker, topic, subtopic in self._TOPIC_MAP:
+            if marker in source:
+                doc.metadata["topic"] = topic
+                if subtopic is not None:
+                    doc.metadata["subtopic"] = subtopic
+                break
 
         # Определяем сложность
-        if "subjonctif" in content or "conditionnel" in content:
-            doc.metadata["difficulty"] = "advanced"
-        elif "passé composé" in content or "imparfait" in content:
-            doc.metadata["difficulty"] = "intermediate"
-        else:
-            doc.metadata["difficulty"] = "beginner"
+        doc.metadata["difficulty"] = "beginner"
+        for marker, difficulty in self._DIFFICULTY_MAP:
+            if marker in content:
+                doc.metadata["difficulty"] = difficulty
+                break
 
     def get_vectorstore(self) -> Chroma:
         """Возвращает векторное хранилище."""
@@ -191,9 +321,43 @@ class VectorStoreManager:
         Args:
             documents: Список документов для добавления
         """
-        self.vectorstore.add_documents(documents)
+        self._add_in_batches(self.vectorstore, documents)
         logger.info(f"Added {len(documents)} documents to vectorstore")
 
+        for callback in self._on_documents_added:
+            callback()
+
+    def on_documents_added(self, callback: Callable[[], None]) -> None:
+        """
+        Регистрирует обработчик, вызываемый после add_documents.
+
+        Args:
+            callback: Функция без аргументов, например retriever.clear_cache
+        """
+        self._on_documents_added.append(callback)
+
+    def _add_in_batches(self, vectorstore: Chroma, documents: Iterable[Document]) -> int:
+        """
+        Добавляет документы батчами по config.batch_size.
+
+        Каждый батч эмбеддится одним вызовом embed_documents и вставляется
+        одним upsert, поэтому задержка вставки не растёт с размером базы.
+        Принимает и генератор: одновременно в памяти только один батч.
+
+        Returns:
+            Количество добавленных документов
+        """
+        batch_size = max(self.config.batch_size, 1)
+        iterator = iter(documents)
+        added = 0
+        batch_number = 0
+        while batch := list(itertools.islice(iterator, batch_size)):
+            vectorstore.add_documents(batch)
+            added += len(batch)
+            batch_number += 1
+            logger.debug(f"Indexed batch {batch_number}: {len(batch)} documents")
+        return added
+
     def get_collection_count(self) -> int:
         """Возвращает количество документов в коллекции."""
         return self.vectorstore._collection.count()
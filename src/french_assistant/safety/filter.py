@@ -7,14 +7,47 @@
 3. Слишком длинных запросов
 """
 
+import functools
 import re
 import logging
-from typing import Dict, List, Tuple
+from collections import Counter
+from typing import Dict, Optional, Tuple
+
+# Aho–Corasick находит все ключевые слова темы за один проход по тексту;
+# без него используется поиск подстроки для каждого слова
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
 
 from ..core.config import SafetyConfig
 
 logger = logging.getLogger(__name__)
 
+# Французские символы с диакритикой
+_FRENCH_CHARS_RE = re.compile(r"[éèêëàâäùûüôöîïç]")
+
+# Глобальные флаги вида (?i) в начале паттерна
+_INLINE_FLAGS_RE = re.compile(r"^\(\?([aiLmsux]+)\)")
+
+
+@functools.lru_cache(maxsize=None)
+def _combine_patterns(patterns: Tuple[str, ...]) -> "re.Pattern[str]":
+    """
+    Объединяет паттерны в одно регулярное выражение с альтернацией.
+
+    Каждый паттерн становится именованной группой p<индекс>, а его глобальные
+    флаги - локальными, чтобы текст просматривался один раз. Результат
+    кэшируется, поэтому новые экземпляры фильтра не компилируют его заново.
+    """
+    groups = []
+    for i, pattern in enumerate(patterns):
+        flags = _INLINE_FLAGS_RE.match(pattern)
+        if flags:
+            pattern = f"(?{flags.group(1)}:{pattern[flags.end():]})"
+        groups.append(f"(?P<p{i}>{pattern})")
+    return re.compile("|".join(groups))
+
 
 class SafetyFilter:
     """
@@ -64,13 +97,41 @@ class SafetyFilter:
         """
         self.config = config or SafetyConfig()
         self.max_length = self.config.max_length
-        self.blocked_patterns = [re.compile(p) for p in self.INJECTION_PATTERNS]
+        self._injection_re = _combine_patterns(tuple(self.INJECTION_PATTERNS))
+        self._topic_automaton = self._build_topic_automaton()
+
+        # Результаты проверок детерминированы, поэтому повторные запросы
+        # (ретраи, вызовы инструментов) обслуживаются из кэша
+        self._filter_cached = functools.lru_cache(maxsize=4096)(self._filter_frozen)
 
         logger.info(
             "SafetyFilter initialized with %d injection patterns",
             len(self.INJECTION_PATTERNS)
         )
 
+    def _build_topic_automaton(self) -> Optional[object]:
+        """Строит автомат Aho–Corasick по ключевым словам темы (None, если недоступен)."""
+        if ahocorasick is None:
+            return None
+
+        automaton = ahocorasick.Automaton()
+        for lang, keywords in (("ru", self.TOPIC_KEYWORDS_RU), ("fr", self.TOPIC_KEYWORDS_FR)):
+            for kw in keywords:
+                automaton.add_word(kw, (lang, kw))
+        automaton.make_automaton()
+        return automaton
+
+    def _count_topic_keywords(self, text_lower: str) -> Counter:
+        """Считает найденные ключевые слова по языкам (каждое слово - один раз)."""
+        if self._topic_automaton is not None:
+            matched = {match for _, match in self._topic_automaton.iter(text_lower)}
+            return Counter(lang for lang, _ in matched)
+
+        return Counter(
+            ru=sum(1 for kw in self.TOPIC_KEYWORDS_RU if kw in text_lower),
+            fr=sum(1 for kw in self.TOPIC_KEYWORDS_FR if kw in text_lower),
+        )
+
     def check_injection(self, text: str) -> Tuple[bool, str]:
         """
         Проверяет текст на prompt injection.
@@ -81,9 +142,10 @@ class SafetyFilter:
         Returns:
             (is_safe, error_message)
         """
-        for pattern in self.blocked_patterns:
-            if pattern.search(text):
-                return False, f"Обнаружена попытка injection: {pattern.pattern}"
+        match = self._injection_re.search(text)
+        if match:
+            pattern = self.INJECTION_PATTERNS[int(match.lastgroup[1:])]
+            return False, f"Обнаружена попытка injection: {pattern}"
         return True, ""
 
     def check_topic_relevance(self, text: str) -> Tuple[bool, float]:
@@ -99,14 +161,15 @@ class SafetyFilter:
         text_lower = text.lower()
 
         # Подсчёт совпадений с ключевыми словами
-        ru_matches = sum(1 for kw in self.TOPIC_KEYWORDS_RU if kw in text_lower)
-        fr_matches = sum(1 for kw in self.TOPIC_KEYWORDS_FR if kw in text_lower)
+        counts = self._count_topic_keywords(text_lower)
+        ru_matches = counts["ru"]
+        fr_matches = counts["fr"]
 
         word_count = len(text.split())
         score = (ru_matches + fr_matches) / min(10, max(word_count, 1))
 
         # Проверка наличия французских символов
-        has_french_chars = bool(re.search(r"[éèêëàâäùûüôöîïç]", text_lower))
+        has_french_chars = _FRENCH_CHARS_RE.search(text_lower) is not None
 
         is_relevant = ru_matches > 0 or fr_matches > 0 or has_french_chars or score > 0.1
 
@@ -126,6 +189,10 @@ class SafetyFilter:
             return False, f"Текст слишком длинный ({len(text)} > {self.max_length})"
         return True, ""
 
+    def clear_cache(self) -> None:
+        """Очищает кэш результатов filter_input (например, после смены конфигурации)."""
+        self._filter_cached.cache_clear()
+
     def filter_input(self, text: str) -> Tuple[bool, str, Dict]:
         """
         Комплексная фильтрация входного запроса.
@@ -140,21 +207,37 @@ class SafetyFilter:
             is_safe, error, meta = filter.filter_input("Переведи: Привет")
             # is_safe=True, error="", meta={"checks_passed": [...]}
         """
+        # Слишком длинные тексты отсекаются первым делом, до кэша и до
+        # регулярных выражений: для них достаточно одного сравнения
+        if len(text) > self.max_length:
+            _, msg = self.check_length(text)
+            return False, msg, {"original_length": len(text), "checks_passed": []}
+
+        is_safe, msg, frozen_meta = self._filter_cached(text)
+        metadata = dict(frozen_meta)
+        metadata["checks_passed"] = list(metadata["checks_passed"])
+        # Логируем вне кэша: повторные попытки injection тоже попадают в лог
+        if not is_safe and "injection" not in metadata["checks_passed"]:
+            logger.warning(f"Injection detected: {text[:100]}...")
+        return is_safe, msg, metadata
+
+    def _filter_frozen(self, text: str) -> Tuple[bool, str, Tuple]:
+        """Выполняет проверки; метаданные возвращаются неизменяемыми для кэша."""
+        is_safe, msg, metadata = self._run_checks(text)
+        metadata["checks_passed"] = tuple(metadata["checks_passed"])
+        return is_safe, msg, tuple(metadata.items())
+
+    def _run_checks(self, text: str) -> Tuple[bool, str, Dict]:
+        """Выполняет проверки входного текста, идущие после проверки длины."""
+        # 1. Длина уже проверена в filter_input
         metadata = {
             "original_length": len(text),
-            "checks_passed": []
+            "checks_passed": ["length"]
         }
 
-        # 1. Проверка длины
-        is_ok, msg = self.check_length(text)
-        if not is_ok:
-            return False, msg, metadata
-        metadata["checks_passed"].append("length")
-
         # 2. Проверка на injection
         is_ok, msg = self.check_injection(text)
         if not is_ok:
-            logger.warning(f"Injection detected: {text[:100]}...")
             return False, "Извините, я не могу обработать этот запрос.", metadata
         metadata["checks_passed"].append("injection")
 
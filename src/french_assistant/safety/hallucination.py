@@ -9,10 +9,27 @@
 
 import re
 import logging
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
+# Французские слова ответа (нижний регистр) и русские грамматические термины
+_FRENCH_TERM_RE = re.compile(r"\b[a-zéèêëàâäùûüôöîïç]{3,}\b")
+_TECH_TERM_RE = re.compile(r"\b(?:артикль|глагол|спряжение|время|наклонение)\w*")
+
+# Французские слова ответа в исходном регистре
+_FRENCH_WORD_RE = re.compile(r"\b[A-Za-zéèêëàâäùûüôöîïç]{3,}\b")
+
+_SENT_SPLIT_RE = re.compile(r"[.!?]")
+
+# Слова контекста для проверки заземления
+_CONTEXT_TOKEN_RE = re.compile(r"\w+")
+
+
+def _context_tokens(context: str) -> FrozenSet[str]:
+    """Токенизирует контекст один раз для всех проверок заземления."""
+    return frozenset(_CONTEXT_TOKEN_RE.findall(context.lower()))
+
 
 class HallucinationDetector:
     """
@@ -44,7 +61,8 @@ class HallucinationDetector:
     def check_lexical_grounding(
         self,
         response: str,
-        context: str
+        context: str,
+        context_tokens: Optional[FrozenSet[str]] = None
     ) -> Tuple[float, List[str]]:
         """
         Проверяет лексическое заземление ответа на контекст.
@@ -52,32 +70,40 @@ class HallucinationDetector:
         Args:
             response: Ответ модели
             context: Контекст из retrieved документов
+            context_tokens: Слова контекста (опционально, если уже токенизирован)
 
         Returns:
             (grounding_score, ungrounded_terms)
         """
-        # Извлекаем французские слова и технические термины
-        french_terms = re.findall(r"\b[a-zéèêëàâäùûüôöîïç]{3,}\b", response.lower())
-        technical_terms = re.findall(
-            r"\b(?:артикль|глагол|спряжение|время|наклонение)\w*",
-            response.lower()
-        )
+        if context_tokens is None:
+            context_tokens = _context_tokens(context)
+        return self._check_lexical_grounding(response.lower(), context_tokens)
 
-        all_terms = set(french_terms + technical_terms)
-        context_lower = context.lower()
-
-        ungrounded = []
-        grounded_count = 0
+    def _check_lexical_grounding(
+        self,
+        response_lower: str,
+        context_tokens: FrozenSet[str]
+    ) -> Tuple[float, List[str]]:
+        """Лексическое заземление по ответу в нижнем регистре."""
+        # Извлекаем французские слова и технические термины
+        all_terms = set(_FRENCH_TERM_RE.findall(response_lower))
+        all_terms.update(_TECH_TERM_RE.findall(response_lower))
 
-        for term in all_terms:
-            if term in context_lower:
-                grounded_count += 1
-            elif len(term) > 4:
-                ungrounded.append(term)
+        # Пересечение множеств считается на уровне C, без цикла по терминам
+        grounded = all_terms & context_tokens
+        ungrounded = [term for term in all_terms - grounded if len(term) > 4]
 
-        score = grounded_count / max(len(all_terms), 1)
+        score = len(grounded) / max(len(all_terms), 1)
         return score, ungrounded[:10]
 
+    @staticmethod
+    def _split_sentences(
+        response: str,
+        response_lower: str
+    ) -> Tuple[List[str], List[str]]:
+        """Разбивает ответ на предложения: исходные и в нижнем регистре."""
+        return _SENT_SPLIT_RE.split(response), _SENT_SPLIT_RE.split(response_lower)
+
     def check_semantic_consistency(self, response: str) -> Tuple[bool, List[str]]:
         """
         Проверяет внутреннюю согласованность ответа.
@@ -88,8 +114,17 @@ class HallucinationDetector:
         Returns:
             (is_consistent, inconsistencies)
         """
+        return self._check_semantic_consistency(
+            *self._split_sentences(response, response.lower())
+        )
+
+    def _check_semantic_consistency(
+        self,
+        sentences: List[str],
+        sent_lowers: List[str]
+    ) -> Tuple[bool, List[str]]:
+        """Согласованность по заранее разбитым предложениям."""
         inconsistencies = []
-        sentences = re.split(r"[.!?]", response)
 
         # Пары противоположных утверждений
         negation_pairs = [
@@ -99,18 +134,24 @@ class HallucinationDetector:
             ("мужской род", "женский род"),
         ]
 
-        for sent1 in sentences:
-            for sent2 in sentences:
-                if sent1 == sent2:
-                    continue
-                for pos, neg in negation_pairs:
-                    if pos in sent1.lower() and neg in sent2.lower():
-                        words1 = set(sent1.lower().split())
-                        words2 = set(sent2.lower().split())
-                        if len(words1 & words2) > 3:
-                            inconsistencies.append(
-                                f"Возможное противоречие: {pos} vs {neg}"
-                            )
+        # Слова каждого предложения выделяются один раз; сравниваются
+        # только пары, где в одном есть pos, а в другом - neg
+        word_sets = [set(sent.split()) for sent in sent_lowers]
+
+        for pos, neg in negation_pairs:
+            pos_idx = [i for i, sent in enumerate(sent_lowers) if pos in sent]
+            if not pos_idx:
+                continue
+            neg_idx = [j for j, sent in enumerate(sent_lowers) if neg in sent]
+
+            for i in pos_idx:
+                for j in neg_idx:
+                    if sentences[i] == sentences[j]:
+                        continue
+                    if len(word_sets[i] & word_sets[j]) > 3:
+                        inconsistencies.append(
+                            f"Возможное противоречие: {pos} vs {neg}"
+                        )
 
         return len(inconsistencies) == 0, inconsistencies
 
@@ -128,13 +169,24 @@ class HallucinationDetector:
             (confidence_level, overconfident_claims)
         """
         response_lower = response.lower()
+        return self._check_confidence_calibration(
+            response_lower, *self._split_sentences(response, response_lower)
+        )
+
+    def _check_confidence_calibration(
+        self,
+        response_lower: str,
+        sentences: List[str],
+        sent_lowers: List[str]
+    ) -> Tuple[str, List[str]]:
+        """Калибровка уверенности по ответу в нижнем регистре и его предложениям."""
         overconfident = []
 
         # Ищем сверхуверенные утверждения
         for marker in self.CONFIDENCE_MARKERS["high"]:
             if marker in response_lower:
-                for sent in re.split(r"[.!?]", response):
-                    if marker in sent.lower():
+                for sent, sent_lower in zip(sentences, sent_lowers):
+                    if marker in sent_lower:
                         overconfident.append(sent.strip())
 
         if len(overconfident) > 2:
@@ -147,7 +199,8 @@ class HallucinationDetector:
     def check_grounding(
         self,
         response: str,
-        context: str
+        context: str,
+        context_tokens: Optional[FrozenSet[str]] = None
     ) -> Tuple[bool, float, List[str]]:
         """
         Проверяет ответ на возможные галлюцинации (упрощённая версия).
@@ -155,22 +208,21 @@ class HallucinationDetector:
         Args:
             response: Ответ модели
             context: Контекст из retrieved документов
+            context_tokens: Слова контекста (опционально, если уже токенизирован)
 
         Returns:
             (is_grounded, grounding_score, ungrounded_claims)
         """
         # Извлекаем французские слова из ответа
-        french_words = re.findall(
-            r"\b[A-Za-zéèêëàâäùûüôöîïç]{3,}\b",
-            response
-        )
+        french_words = _FRENCH_WORD_RE.findall(response)
 
-        context_lower = context.lower()
+        if context_tokens is None:
+            context_tokens = _context_tokens(context)
         grounded_count = 0
         ungrounded_claims = []
 
         for word in french_words:
-            if word.lower() in context_lower:
+            if word.lower() in context_tokens:
                 grounded_count += 1
             elif len(word) > 5:
                 ungrounded_claims.append(word)
@@ -208,7 +260,14 @@ class HallucinationDetector:
         }
 
         # 1. Лексическое заземление
-        grounding_score, ungrounded = self.check_lexical_grounding(response, context)
+        # Ответ и контекст приводятся к нижнему регистру и разбираются один раз
+        response_lower = response.lower()
+        context_tokens = _context_tokens(context)
+        sentences, sent_lowers = self._split_sentences(response, response_lower)
+
+        grounding_score, ungrounded = self._check_lexical_grounding(
+            response_lower, context_tokens
+        )
         results["grounding_score"] = grounding_score
         results["ungrounded_terms"] = ungrounded
 
@@ -218,7 +277,9 @@ class HallucinationDetector:
             results["has_hallucinations"] = True
 
         # 2. Семантическая согласованность
-        is_consistent, inconsistencies = self.check_semantic_consistency(response)
+        is_consistent, inconsistencies = self._check_semantic_consistency(
+            sentences, sent_lowers
+        )
         results["is_consistent"] = is_consistent
         results["inconsistencies"] = inconsistencies
 
@@ -228,7 +289,9 @@ class HallucinationDetector:
             results["has_hallucinations"] = True
 
         # 3. Калибровка уверенности
-        conf_level, overconfident = self.check_confidence_calibration(response)
+        conf_level, overconfident = self._check_confidence_calibration(
+            response_lower, sentences, sent_lowers
+        )
         results["confidence_level"] = conf_level
         results["overconfident_claims"] = overconfident
 
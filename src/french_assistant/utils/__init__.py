@@ -4,6 +4,7 @@
 Модули:
 - tracing: Трассировка и отладка pipeline
 - logging: Настройка логирования
+- lazy: Ленивый импорт публичных объектов пакетов
 """
 
 from .tracing import TraceEvent, TracingManager
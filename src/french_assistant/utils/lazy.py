@@ -0,0 +1,45 @@
+"""
+Ленивый импорт публичных объектов пакета (PEP 562).
+
+Пакеты объявляют, из какого модуля берётся каждый объект, и получают
+__getattr__/__dir__ уровня модуля: тяжёлые зависимости импортируются
+только при первом обращении к объекту.
+"""
+
+import importlib
+from typing import Any, Callable, Dict, List, Mapping, Tuple
+
+
+def lazy_exports(
+    namespace: Dict[str, Any],
+    imports: Mapping[str, str]
+) -> Tuple[Callable[[str], Any], Callable[[], List[str]]]:
+    """
+    Создаёт __getattr__ и __dir__ для ленивого импорта.
+
+    Args:
+        namespace: globals() пакета
+        imports: Имя объекта -> относительный путь модуля (например, ".config")
+
+    Returns:
+        (__getattr__, __dir__) для присваивания в пакете
+
+    Пример:
+        __getattr__, __dir__ = lazy_exports(globals(), {"load_config": ".config"})
+    """
+    package = namespace["__name__"]
+
+    def __getattr__(name: str) -> Any:
+        """Импортирует публичный объект при первом обращении и кэширует его."""
+        module_path = imports.get(name)
+        if module_path is None:
+            raise AttributeError(f"module {package!r} has no attribute {name!r}")
+
+        value = getattr(importlib.import_module(module_path, package), name)
+        namespace[name] = value
+        return value
+
+    def __dir__() -> List[str]:
+        return sorted(set(namespace) | set(namespace.get("__all__", ())))
+
+    return __getattr__, __dir__
@@ -4,12 +4,19 @@
 Предоставляет единую точку конфигурации логирования для всего пакета.
 """
 
+import functools
 import logging
 import os
 from pathlib import Path
 from typing import Optional
 
 
+@functools.lru_cache(maxsize=8)
+def _get_formatter(log_format: str) -> logging.Formatter:
+    """Возвращает общий форматтер: строка формата разбирается один раз."""
+    return logging.Formatter(log_format)
+
+
 def setup_logging(
     log_level: str = "INFO",
     log_file: Optional[str] = None,
@@ -37,12 +44,18 @@ def setup_logging(
     logger = logging.getLogger("french_assistant")
     logger.setLevel(getattr(logging, log_level.upper(), logging.INFO))
 
-    # Очищаем существующие хэндлеры
-    logger.handlers.clear()
+    # Закрываем и снимаем существующие хэндлеры: иначе каждый повторный
+    # вызов оставлял бы открытым дескриптор файла логов
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+        handler.close()
+
+    formatter = _get_formatter(log_format)
 
-    # Консольный хэндлер
+    # Консольный хэндлер создаётся заново, чтобы писать в текущий sys.stderr
+    # (его подменяют pytest и перенаправление вывода)
     console_handler = logging.StreamHandler()
-    console_handler.setFormatter(logging.Formatter(log_format))
+    console_handler.setFormatter(formatter)
     logger.addHandler(console_handler)
 
     # Файловый хэндлер (если указан путь)
@@ -51,7 +64,7 @@ def setup_logging(
         log_path.parent.mkdir(parents=True, exist_ok=True)
 
         file_handler = logging.FileHandler(log_file, encoding="utf-8")
-        file_handler.setFormatter(logging.Formatter(log_format))
+        file_handler.setFormatter(formatter)
         logger.addHandler(file_handler)
 
     return logger
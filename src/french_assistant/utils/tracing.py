@@ -6,20 +6,32 @@
 - TracingManager: менеджер для записи и анализа событий
 """
 
-import hashlib
 import logging
+import secrets
+import threading
+import time
+from collections import defaultdict, deque
 from dataclasses import dataclass, field
-from datetime import datetime
-from typing import Any, Dict, List
+from typing import Any, Deque, Dict, Iterator, List
 
 logger = logging.getLogger(__name__)
 
+# Формат времени событий в отчёте (миллисекунды дописываются отдельно)
+_REPORT_TIME_FORMAT = "%H:%M:%S"
 
-@dataclass
+
+def _truncate(data: Any, limit: int = 500) -> str:
+    """Обрезает данные события; строки срезаются без лишнего str()."""
+    if isinstance(data, str):
+        return data[:limit]
+    return str(data)[:limit]
+
+
+@dataclass(slots=True)
 class TraceEvent:
     """Событие трассировки для отладки и анализа."""
 
-    timestamp: datetime
+    timestamp: int  # наносекунды с начала эпохи (time.time_ns())
     event_type: str
     component: str
     input_data: Any
@@ -37,11 +49,32 @@ class TracingManager:
         tracer.log_event("query_received", "Assistant", query, "processing")
         # ... выполнение операций ...
         print(tracer.get_trace_report())
+
+    История событий ограничена max_events последними записями, чтобы память
+    не росла в долгих сессиях. При enabled=False события не записываются.
+    Менеджер потокобезопасен: события пишутся из пула потоков process_queries
+    и из asyncio.to_thread в aprocess_query.
     """
 
-    def __init__(self):
-        self.events: List[TraceEvent] = []
-        self.session_id = hashlib.md5(str(datetime.now()).encode()).hexdigest()[:8]
+    def __init__(self, enabled: bool = True, max_events: int = 10_000):
+        """
+        Инициализирует менеджер трассировки.
+
+        Args:
+            enabled: Записывать ли события
+            max_events: Максимальное количество хранимых событий (не меньше 1)
+        """
+        if max_events < 1:
+            raise ValueError(f"max_events must be >= 1, got {max_events}")
+
+        self.enabled = enabled
+        self.events: Deque[TraceEvent] = deque(maxlen=max_events)
+        # Индекс событий по компонентам; синхронизирован с вытеснением из events
+        self._by_component: Dict[str, Deque[TraceEvent]] = defaultdict(deque)
+        self._total_duration_ms = 0.0
+        # Защищает events, индекс по компонентам и суммарную длительность
+        self._lock = threading.Lock()
+        self.session_id = secrets.token_hex(4)
 
     def log_event(
         self,
@@ -63,47 +96,71 @@ class TracingManager:
             metadata: Дополнительные метаданные
             duration_ms: Длительность операции в миллисекундах
         """
+        if not self.enabled:
+            return
+
         event = TraceEvent(
-            timestamp=datetime.now(),
+            timestamp=time.time_ns(),
             event_type=event_type,
             component=component,
-            input_data=str(input_data)[:500],
-            output_data=str(output_data)[:500],
+            input_data=_truncate(input_data),
+            output_data=_truncate(output_data),
             metadata=metadata or {},
             duration_ms=duration_ms
         )
-        self.events.append(event)
-        logger.debug(f"[TRACE][{component}] {event_type}: {str(input_data)[:100]}...")
-
-    def get_trace_report(self) -> str:
-        """Генерирует текстовый отчёт о трассировке."""
-        report = [
-            f"\n{'=' * 60}",
-            f"TRACE REPORT - Session: {self.session_id}",
-            f"{'=' * 60}"
-        ]
-
-        for event in self.events:
-            report.append(
-                f"\n[{event.timestamp.strftime('%H:%M:%S.%f')[:-3]}] "
+        with self._lock:
+            if len(self.events) == self.events.maxlen:
+                # Вытесняемое событие - самое старое и в своём компоненте
+                evicted = self.events[0]
+                self._by_component[evicted.component].popleft()
+                self._total_duration_ms -= evicted.duration_ms
+
+            self.events.append(event)
+            self._by_component[component].append(event)
+            self._total_duration_ms += duration_ms
+        logger.debug(f"[TRACE][{component}] {event_type}: {event.input_data[:100]}...")
+
+    def _iter_report_lines(self) -> Iterator[str]:
+        """Построчно генерирует отчёт о трассировке."""
+        yield f"\n{'=' * 60}"
+        yield f"TRACE REPORT - Session: {self.session_id}"
+        yield "=" * 60
+
+        # Снимок под блокировкой: другие потоки могут писать события
+        with self._lock:
+            events = list(self.events)
+
+        for event in events:
+            # Перевод во время по часам только при построении отчёта
+            seconds, nanos = divmod(event.timestamp, 1_000_000_000)
+            wall_clock = time.strftime(_REPORT_TIME_FORMAT, time.localtime(seconds))
+            yield (
+                f"\n[{wall_clock}.{nanos // 1_000_000:03d}] "
                 f"{event.component} -> {event.event_type}"
             )
-            report.append(f"  Input: {event.input_data[:100]}...")
-            report.append(f"  Output: {event.output_data[:100]}...")
+            yield f"  Input: {event.input_data[:100]}..."
+            yield f"  Output: {event.output_data[:100]}..."
             if event.duration_ms > 0:
-                report.append(f"  Duration: {event.duration_ms:.2f}ms")
+                yield f"  Duration: {event.duration_ms:.2f}ms"
 
-        return "\n".join(report)
+    def get_trace_report(self) -> str:
+        """Генерирует текстовый отчёт о трассировке."""
+        return "\n".join(self._iter_report_lines())
 
     def get_events_by_component(self, component: str) -> List[TraceEvent]:
         """Возвращает события для указанного компонента."""
-        return [e for e in self.events if e.component == component]
+        with self._lock:
+            return list(self._by_component.get(component, ()))
 
     def get_total_duration(self) -> float:
         """Возвращает общую длительность всех операций."""
-        return sum(e.duration_ms for e in self.events)
+        with self._lock:
+            return self._total_duration_ms
 
     def clear(self) -> None:
         """Очищает историю событий."""
-        self.events.clear()
-        self.session_id = hashlib.md5(str(datetime.now()).encode()).hexdigest()[:8]
+        with self._lock:
+            self.events.clear()
+            self._by_component.clear()
+            self._total_duration_ms = 0.0
+        self.session_id = secrets.token_hex(4)
@@ -2,40 +2,88 @@
 Тесты RAG-улучшений.
 """
 
+import re
+import threading
+
+import numpy as np
 import pytest
 from french_assistant.enhancements import (
     SelfRAG,
     CorrectiveRAG,
     ChainOfVerification,
+    PreparedDoc,
     RetrievalQuality,
+    prepare_documents,
+)
+from langchain_core.documents import Document
+
+from french_assistant.core.config import RetrievalConfig
+from french_assistant.retrieval import QueryExpander, SemanticCache
+from french_assistant.retrieval.retriever import EnhancedRetriever
+from french_assistant.retrieval import vectorstore
+from french_assistant.retrieval.vectorstore import VectorStoreManager
+
+_PARLER_QUERY = "спряжение parler"
+_PARLER_DOC = "parler (говорить): je parle, tu parles, il parle, nous parlons"
+
+_HYDE_RE = re.compile(r"французск|avoir", re.IGNORECASE)
+
+_RETRIEVAL_NEED_CASES = (
+    ("Переведи: Я работаю", True),
+    ("Как спрягается avoir?", True),
+    ("Привет!", False),
+    ("Спасибо", False),
 )
-from french_assistant.retrieval import QueryExpander
+
+
+class CountingLLM:
+    """LLM, считающий вызовы predict; первые failures вызовов падают."""
+
+    def __init__(self, failures=0):
+        self.calls = 0
+        self.failures = failures
+
+    def predict(self, prompt):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise RuntimeError("LLM недоступен")
+        return "avoir - вспомогательный глагол"
+
+
+@pytest.fixture(scope="module")
+def parler_tokens():
+    """Запрос и документ про parler, токенизированные один раз на модуль."""
+    query, doc = prepare_documents([_PARLER_QUERY, _PARLER_DOC])
+    return query, doc
 
 
 class TestSelfRAG:
     """Тесты Self-RAG."""
 
-    @pytest.fixture
+    @pytest.fixture(scope="module")
     def self_rag(self):
         return SelfRAG()
 
-    @pytest.mark.parametrize("query,expected", [
-        ("Переведи: Я работаю", True),
-        ("Как спрягается avoir?", True),
-        ("Привет!", False),
-        ("Спасибо", False),
-    ])
+    @pytest.mark.parametrize(
+        "query,expected",
+        _RETRIEVAL_NEED_CASES,
+        ids=[query for query, _ in _RETRIEVAL_NEED_CASES],
+    )
     def test_retrieval_need(self, self_rag, query, expected):
         needs, confidence = self_rag.assess_retrieval_need(query)
         assert needs == expected
         assert 0 <= confidence <= 1
 
     def test_relevance_assessment(self, self_rag):
-        query = "спряжение parler"
-        doc = "parler (говорить): je parle, tu parles, il parle, nous parlons"
+        quality, score = self_rag.assess_relevance(_PARLER_QUERY, _PARLER_DOC)
+        assert quality & (RetrievalQuality.EXCELLENT | RetrievalQuality.GOOD)
+
+    def test_relevance_assessment_tokens(self, self_rag, parler_tokens):
+        query, doc = parler_tokens
+        key_terms = {w for w in query.words if len(w) > 4}
 
-        quality, score = self_rag.assess_relevance(query, doc)
-        assert quality in [RetrievalQuality.EXCELLENT, RetrievalQuality.GOOD]
+        result = self_rag.assess_relevance_tokens(query.words, key_terms, doc.words)
+        assert result == self_rag.assess_relevance(_PARLER_QUERY, _PARLER_DOC)
 
     def test_utility_assessment(self, self_rag):
         query = "Как сказать привет?"
@@ -52,7 +100,7 @@ class TestSelfRAG:
 class TestCorrectiveRAG:
     """Тесты CRAG."""
 
-    @pytest.fixture
+    @pytest.fixture(scope="module")
     def crag(self):
         return CorrectiveRAG()
 
@@ -63,7 +111,7 @@ class TestCorrectiveRAG:
         quality = crag.evaluate_retrieval_quality(query, docs)
         assert quality == RetrievalQuality.EXCELLENT
 
-        _, meta = crag.correct(query, docs)
+        _, meta = crag.correct(query, docs, quality=quality)
         assert meta["strategy"] == "none"
         assert not meta["correction_applied"]
 
@@ -74,16 +122,37 @@ class TestCorrectiveRAG:
         quality = crag.evaluate_retrieval_quality(query, docs)
         assert quality == RetrievalQuality.POOR
 
-        corrected, meta = crag.correct(query, docs)
+        corrected, meta = crag.correct(query, docs, quality=quality)
         assert meta["strategy"] == "fallback"
         assert meta["correction_applied"]
+        assert meta["fallback_marker"] == "Базовые знания"
         assert any("Базовые знания" in d for d in corrected)
 
+    def test_accepts_prepared_documents(self, crag):
+        query = "спряжение parler"
+        docs = ["parler: je parle, tu parles, il parle", "Москва столица"]
+
+        raw_result = crag.correct(query, list(docs))
+        prepared_result = crag.correct(query, prepare_documents(docs))
+        assert prepared_result == raw_result
+
+    def test_precomputed_quality_skips_tokenization(self, crag, monkeypatch):
+        def fail(text):
+            raise AssertionError("documents must not be prepared")
+
+        monkeypatch.setattr(PreparedDoc, "from_text", fail)
+        corrected, meta = crag.correct(
+            "спряжение parler", ["Москва столица"], quality=RetrievalQuality.EXCELLENT
+        )
+
+        assert meta["strategy"] == "none"
+        assert corrected == ["Москва столица"]
+
 
 class TestQueryExpander:
     """Тесты QueryExpander."""
 
-    @pytest.fixture
+    @pytest.fixture(scope="module")
     def expander(self):
         return QueryExpander()
 
@@ -99,13 +168,203 @@ class TestQueryExpander:
     def test_hyde_generation(self, expander):
         hyde_doc = expander.generate_hyde_document("спряжение avoir")
         assert len(hyde_doc) > 0
-        assert "французск" in hyde_doc.lower() or "avoir" in hyde_doc.lower()
+        assert _HYDE_RE.search(hyde_doc)
+
+    def test_hyde_llm_result_is_cached(self):
+        llm = CountingLLM()
+        expander = QueryExpander(llm=llm)
+        first = expander.generate_hyde_document("спряжение avoir")
+        second = expander.generate_hyde_document("спряжение avoir")
+
+        assert first == second
+        assert llm.calls == 1
+
+    def test_hyde_failure_is_retried_by_expand_query(self):
+        llm = CountingLLM(failures=1)
+        expander = QueryExpander(llm=llm)
+
+        fallback = expander.expand_query("спряжение avoir", use_hyde=True)
+        retried = expander.expand_query("спряжение avoir", use_hyde=True)
+
+        assert "avoir - вспомогательный глагол" not in fallback
+        assert retried[-1] == "avoir - вспомогательный глагол"
+        assert llm.calls == 2
+
+    def test_hyde_disk_cache_survives_new_expander(self, tmp_path):
+        llm = CountingLLM()
+        first = QueryExpander(llm=llm, hyde_cache_dir=tmp_path)
+        second = QueryExpander(llm=llm, hyde_cache_dir=tmp_path)
+
+        assert first.generate_hyde_document("спряжение avoir") == \
+            second.generate_hyde_document("спряжение avoir")
+        assert llm.calls == 1
+
+
+class TestSemanticCache:
+    """Тесты семантического кэша."""
+
+    def test_hit_on_similar_query(self):
+        cache = SemanticCache(max_size=2, threshold=0.95)
+        docs = [Document(page_content="avoir: j'ai, tu as")]
+        cache.add([1.0, 0.0, 0.0], docs)
+
+        assert cache.lookup([0.99, 0.05, 0.0]) == docs
+        assert cache.lookup([0.0, 1.0, 0.0]) is None
+
+    def test_evicts_oldest(self):
+        cache = SemanticCache(max_size=1, threshold=0.95)
+        cache.add([1.0, 0.0], [Document(page_content="old")])
+        cache.add([0.0, 1.0], [Document(page_content="new")])
+
+        assert len(cache) == 1
+        assert cache.lookup([1.0, 0.0]) is None
+
+    def test_concurrent_adds_keep_vectors_aligned(self):
+        cache = SemanticCache(max_size=50, threshold=0.99)
+        vectors = np.random.default_rng(0).normal(size=(400, 64))
+
+        def add_range(start):
+            for i in range(start, 400, 8):
+                cache.add(vectors[i], [Document(page_content=str(i))])
+
+        threads = [threading.Thread(target=add_range, args=(n,)) for n in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(cache) == 50
+        hits = 0
+        for i in range(400):
+            docs = cache.lookup(vectors[i])
+            if docs is not None:
+                assert docs[0].page_content == str(i)
+                hits += 1
+        assert hits == 50
+
+
+class StubVectorStore:
+    """Хранилище без эмбеддингов: поиск идёт через as_retriever."""
+
+    def __init__(self):
+        self.searches = 0
+        self.added = []
+
+    def as_retriever(self, **kwargs):
+        return self
+
+    def get_relevant_documents(self, query):
+        self.searches += 1
+        return [Document(page_content=f"avoir: j'ai, tu as ({query})")]
+
+    def add_documents(self, documents):
+        self.added.extend(documents)
+
+
+class QueryOnlyEmbeddings:
+    """Эмбеддинги, у которых для запросов допустим только embed_query."""
+
+    def embed_query(self, text):
+        return [1.0, 0.0]
+
+    def embed_documents(self, texts):
+        raise AssertionError("queries must be embedded with embed_query")
+
+
+class StubCollection:
+    """Коллекция Chroma с фиксированными кандидатами для любого запроса."""
+
+    CANDIDATES = {"a": [0.6, 0.8], "b": [0.5, 0.86], "c": [1.0, 0.0]}
+
+    def query(self, query_embeddings, n_results, include):
+        n = len(query_embeddings)
+        return {
+            "documents": [list(self.CANDIDATES)] * n,
+            "metadatas": [[None] * len(self.CANDIDATES)] * n,
+            "embeddings": [list(self.CANDIDATES.values())] * n,
+        }
+
+
+class BatchVectorStore(StubVectorStore):
+    """Хранилище с батчевым доступом к коллекции, как у Chroma."""
+
+    embeddings = QueryOnlyEmbeddings()
+    _collection = StubCollection()
+
+
+class TestEnhancedRetriever:
+    """Тесты кэшей EnhancedRetriever."""
+
+    def test_exact_cache_and_clear(self):
+        store = StubVectorStore()
+        retriever = EnhancedRetriever(store)
+
+        first = retriever.retrieve("спряжение avoir", use_expansion=False, use_hyde=False)
+        second = retriever.retrieve("Спряжение  AVOIR", use_expansion=False, use_hyde=False)
+        assert first == second
+        assert store.searches == 1
+
+        retriever.clear_cache()
+        retriever.retrieve("спряжение avoir", use_expansion=False, use_hyde=False)
+        assert store.searches == 2
+
+    def test_batch_search_keeps_mmr_order(self):
+        retriever = EnhancedRetriever(BatchVectorStore(), config=RetrievalConfig(k=2))
+
+        (docs,) = retriever._mmr_search_batch(["спряжение avoir"])
+
+        # MMR выбирает сначала самый похожий "c", затем более разнообразный "a"
+        assert [d.page_content for d in docs] == ["c", "a"]
+
+    def test_hyde_cache_dir_from_config(self, tmp_path):
+        config = RetrievalConfig(hyde_cache_dir=str(tmp_path))
+        retriever = EnhancedRetriever(StubVectorStore(), config=config)
+
+        assert retriever.query_expander.hyde_cache_dir == tmp_path
+
+    def test_adding_documents_invalidates_cache(self):
+        store = StubVectorStore()
+        retriever = EnhancedRetriever(store)
+        manager = VectorStoreManager()
+        manager._vectorstore = store
+        manager.on_documents_added(retriever.clear_cache)
+
+        retriever.retrieve("спряжение avoir", use_expansion=False, use_hyde=False)
+        manager.add_documents([Document(page_content="avoir: nous avons")])
+        retriever.retrieve("спряжение avoir", use_expansion=False, use_hyde=False)
+
+        assert len(store.added) == 1
+        assert store.searches == 2
+
+
+class RecordingEmbeddings:
+    """Заглушка HuggingFaceEmbeddings, запоминающая параметры загрузки."""
+
+    def __init__(self, model_name, model_kwargs, encode_kwargs):
+        self.model_kwargs = model_kwargs
+
+
+class TestLoadEmbeddings:
+    """Тесты загрузки эмбеддингов при старой версии sentence-transformers."""
+
+    @pytest.fixture
+    def old_sentence_transformers(self, monkeypatch):
+        monkeypatch.setattr(vectorstore, "HuggingFaceEmbeddings", RecordingEmbeddings)
+        monkeypatch.setattr(vectorstore, "_sentence_transformers_version", lambda: (2, 7))
+
+    def test_onnx_backend_falls_back_to_torch(self, old_sentence_transformers):
+        embeddings = vectorstore._load_embeddings.__wrapped__("model", "cpu", backend="onnx")
+        assert embeddings.model_kwargs == {"device": "cpu"}
+
+    def test_lazy_weights_disabled(self, old_sentence_transformers):
+        embeddings = vectorstore._load_embeddings.__wrapped__("model", "cpu", lazy_weights=True)
+        assert embeddings.model_kwargs == {"device": "cpu"}
 
 
 class TestChainOfVerification:
     """Тесты CoVe."""
 
-    @pytest.fixture
+    @pytest.fixture(scope="module")
     def cove(self):
         return ChainOfVerification()
 
@@ -122,6 +381,19 @@ class TestChainOfVerification:
         assert is_verified
         assert confidence > 0.3
 
+    def test_verify_claim_returns_evidence_sentence(self, cove):
+        claim = "глагол parler первой группы"
+        context = "parler - глагол первой группы на -er. Пример: je parle"
+
+        assert cove.verify_claim(claim, context)[2] == "parler - глагол первой группы на -er"
+
+    def test_evidence_when_lower_changes_length(self, cove):
+        # "İ".lower() длиннее исходной строки, позиции в нижнем регистре сдвигаются
+        claim = "глагол parler первой группы"
+        context = "İstanbul. parler - глагол первой группы"
+
+        assert cove.verify_claim(claim, context)[2] == "parler - глагол первой группы"
+
     def test_verification_result(self, cove):
         response = "Глагол parler спрягается: je parle, tu parles"
         context = "parler: je parle, tu parles, il parle"
@@ -129,3 +401,10 @@ class TestChainOfVerification:
         result = cove.run_verification(response, context)
         assert result.is_verified
         assert result.confidence > 0
+
+    def test_verify_claims_batch_matches_single_claims(self, cove):
+        claims = ["глагол parler первой группы", "avoir неправильный глагол"]
+        context = "parler - глагол первой группы на -er. Пример: je parle"
+
+        batch = cove.verify_claims_batch(claims, context)
+        assert batch == [cove.verify_claim(claim, context) for claim in claims]
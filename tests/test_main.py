@@ -0,0 +1,44 @@
+"""
+Тесты CLI: пакетная отдача фрагментов стрима.
+"""
+
+import threading
+
+import pytest
+from french_assistant.__main__ import _batch_chunks
+
+
+class TestBatchChunks:
+    """Тесты _batch_chunks."""
+
+    def test_fast_chunks_are_grouped_and_flushed_at_end(self):
+        assert list(_batch_chunks(iter(["je ", "suis", "!"]), interval=10)) == ["je suis!"]
+
+    def test_buffer_is_flushed_before_next_chunk_arrives(self):
+        release = threading.Event()
+
+        def chunks():
+            yield "je "
+            yield "suis"
+            release.wait(5)
+            yield "!"
+
+        batches = _batch_chunks(chunks(), interval=0.2)
+
+        assert next(batches) == "je suis"
+        release.set()
+        assert list(batches) == ["!"]
+
+    def test_error_is_raised_after_flushing_buffer(self):
+        def chunks():
+            yield "je "
+            raise RuntimeError("stream failed")
+
+        batches = _batch_chunks(chunks(), interval=10)
+
+        assert next(batches) == "je "
+        with pytest.raises(RuntimeError):
+            next(batches)
+
+    def test_empty_stream(self):
+        assert list(_batch_chunks(iter([]))) == []
@@ -0,0 +1,128 @@
+"""
+Тесты утилит: логирование и трассировка.
+"""
+
+import io
+import logging
+import sys
+import threading
+
+import pytest
+from french_assistant.utils.lazy import lazy_exports
+from french_assistant.utils.logging import setup_logging
+from french_assistant.utils.tracing import TracingManager
+
+
+@pytest.fixture
+def package_logger():
+    """Возвращает логгер пакета и снимает его хэндлеры после теста."""
+    logger = logging.getLogger("french_assistant")
+    yield logger
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+        handler.close()
+
+
+@pytest.fixture
+def switch_often():
+    """Учащает переключение потоков, чтобы гонки проявлялись стабильно."""
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    yield
+    sys.setswitchinterval(interval)
+
+
+class TestSetupLogging:
+    """Тесты setup_logging."""
+
+    def test_console_handler_uses_current_stderr(self, package_logger, monkeypatch):
+        setup_logging()
+        stream = io.StringIO()
+        monkeypatch.setattr(sys, "stderr", stream)
+
+        setup_logging(log_format="%(message)s")
+        package_logger.info("bonjour")
+
+        assert stream.getvalue() == "bonjour\n"
+
+    def test_repeated_setup_closes_file_handler(self, package_logger, tmp_path):
+        log_file = tmp_path / "app.log"
+        setup_logging(log_file=str(log_file))
+        first = next(h for h in package_logger.handlers if isinstance(h, logging.FileHandler))
+
+        setup_logging(log_file=str(log_file))
+        file_handlers = [h for h in package_logger.handlers if isinstance(h, logging.FileHandler)]
+
+        assert first.stream is None
+        assert len(file_handlers) == 1 and file_handlers[0] is not first
+
+
+class TestTracingManager:
+    """Тесты TracingManager."""
+
+    def test_rejects_non_positive_max_events(self):
+        with pytest.raises(ValueError):
+            TracingManager(max_events=0)
+
+    def test_eviction_keeps_index_and_total_in_sync(self):
+        tracer = TracingManager(max_events=3)
+        for i, component in enumerate(["A", "B", "A", "C", "A"]):
+            tracer.log_event(f"event{i}", component, "in", "out", duration_ms=float(i + 1))
+
+        # Остаются три последних события: event2 (A), event3 (C), event4 (A)
+        assert [e.event_type for e in tracer.events] == ["event2", "event3", "event4"]
+        assert [e.event_type for e in tracer.get_events_by_component("A")] == ["event2", "event4"]
+        assert tracer.get_events_by_component("B") == []
+        assert [e.event_type for e in tracer.get_events_by_component("C")] == ["event3"]
+        assert tracer.get_total_duration() == pytest.approx(3.0 + 4.0 + 5.0)
+
+    def test_concurrent_logging_keeps_index_in_sync(self, switch_often):
+        tracer = TracingManager(max_events=50)
+        components = ["A", "B", "C", "D"]
+
+        def log_events(component):
+            for _ in range(2000):
+                tracer.log_event("event", component, "in", "out", duration_ms=1.0)
+
+        threads = [threading.Thread(target=log_events, args=(c,)) for c in components]
+        for thread in threads:
+            thread.start()
+        # Отчёт строится параллельно с записью событий
+        while any(thread.is_alive() for thread in threads):
+            tracer.get_trace_report()
+        for thread in threads:
+            thread.join()
+
+        indexed = sum(len(tracer.get_events_by_component(c)) for c in components)
+        assert len(tracer.events) == indexed == 50
+        assert tracer.get_total_duration() == pytest.approx(50.0)
+
+    def test_clear_resets_state(self):
+        tracer = TracingManager(max_events=2)
+        tracer.log_event("query", "A", "in", "out", duration_ms=2.0)
+        session_id = tracer.session_id
+
+        tracer.clear()
+
+        assert len(tracer.events) == 0
+        assert tracer.get_events_by_component("A") == []
+        assert tracer.get_total_duration() == 0.0
+        assert tracer.session_id != session_id
+
+
+class TestLazyExports:
+    """Тесты lazy_exports."""
+
+    def test_imports_on_first_access_and_caches(self):
+        namespace = {"__name__": "french_assistant.utils", "__all__": ["TracingManager"]}
+        getattr_, dir_ = lazy_exports(namespace, {"TracingManager": ".tracing"})
+
+        assert "TracingManager" in dir_()
+        assert getattr_("TracingManager") is TracingManager
+        assert namespace["TracingManager"] is TracingManager
+
+    def test_unknown_name_raises_attribute_error(self):
+        getattr_, _ = lazy_exports({"__name__": "french_assistant.utils"}, {})
+
+        with pytest.raises(AttributeError):
+            getattr_("missing")